@@ -1,5 +1,11 @@
-from PyQt5.QtWidgets import QMainWindow, QApplication, QFileDialog, QMessageBox, QTableWidgetItem
+from PyQt5.QtCore import Qt, QDate, QTimer
+from PyQt5.QtWidgets import (
+    QMainWindow, QApplication, QFileDialog, QMessageBox, QTableWidgetItem, QTableView, QAbstractItemView,
+    QComboBox, QLineEdit, QPushButton, QLabel, QHBoxLayout, QVBoxLayout, QWidget, QDateEdit, QCompleter,
+    QInputDialog
+)
 import sys
+import threading
 import traceback
 import os
 from datetime import datetime
@@ -7,38 +13,201 @@ from datetime import datetime
 from MyGratMain import Ui_MainWindow  # Importing your UI class
 from ResultWindow import Ui_ResultWindow  # Importing your Result Window
 
-# Import your logic functions here
-from mainWeekly import (
-    process_orders_for_week,
-    process_time_entries_for_week,
-    distribute_tips_among_employees_for_week,
-    write_excel_data,
-    read_csv_data,
-    role_pool_points, POINT_SYSTEMS
-)
+# Only the plain settings are imported up front. The pipeline modules pull in pandas and NumPy,
+# which take seconds to load on slow PCs, so they are imported where first used and warmed on a
+# background thread once the window is showing
+from point_systems import POINT_SYSTEMS, role_pool_points
 
-def try_parsing_date(text):
-    for fmt in ('%m/%d/%Y', '%m/%d/%y'):
-        try:
-            return datetime.strptime(text, fmt).date()
-        except ValueError:
-            pass
-    raise ValueError(f'time data {text} does not match any of the expected formats')
+# Imported by warm_imports while the user picks files
+HEAVY_MODULES = ('mainWeekly', 'parse_cache', 'workers', 'instrumentation', 'results_model', 'exports', 'history')
 
+# Dropdown entry holding the point system edited directly in the points table
+CUSTOM_POINT_SYSTEM = "Custom"
 
 class ResultsDialog(QMainWindow, Ui_ResultWindow):
-    def __init__(self, data, parent=None):
+    """Weekly totals per employee; double-click an employee to drill down to their shift cuts.
+
+    The generated resultsTable is swapped for a QTableView over a DataFrameTableModel, so only the
+    visible rows are ever formatted and sorting/filtering never rebuilds widget items.
+    """
+
+    FILTER_COLUMNS = ("Employee", "Job Title", "Date")
+
+    def __init__(self, weekly_run, parent=None):
         super(ResultsDialog, self).__init__(parent)
         self.setupUi(self)
-        self.populate_table(data)
 
-    def populate_table(self, data):
-        self.resultsTable.setRowCount(len(data))
-        self.resultsTable.setColumnCount(2)
-        self.resultsTable.setHorizontalHeaderLabels(["Employee", "Weekly Tips"])
-        for row, (employee, tip) in enumerate(data.items()):
-            self.resultsTable.setItem(row, 0, QTableWidgetItem(employee))
-            self.resultsTable.setItem(row, 1, QTableWidgetItem(str(tip)))
+        self.filterColumn = QComboBox()
+        self.filterColumn.addItems(self.FILTER_COLUMNS)
+        self.filterText = QLineEdit()
+        self.filterText.setPlaceholderText("Filter...")
+        self.filterText.setClearButtonEnabled(True)
+        self.backButton = QPushButton("Back to Weekly Totals")
+        self.backButton.setEnabled(False)
+        self.viewLabel = QLabel()
+
+        from results_model import DataFrameTableModel
+        self.model = DataFrameTableModel(parent=self)
+        self.resultsView = QTableView()
+        self.resultsView.setModel(self.model)
+        self.resultsView.setSortingEnabled(True)
+        self.resultsView.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.resultsView.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.resultsView.verticalHeader().setDefaultSectionSize(22)
+        self.resultsView.horizontalHeader().setStretchLastSection(True)
+
+        filter_row = QHBoxLayout()
+        filter_row.addWidget(self.backButton)
+        filter_row.addWidget(self.viewLabel, 1)
+        filter_row.addWidget(self.filterColumn)
+        filter_row.addWidget(self.filterText, 1)
+        layout = QVBoxLayout()
+        layout.addLayout(filter_row)
+        layout.addWidget(self.resultsView)
+        self.resultsTable.hide()
+        self.centralwidget.setLayout(layout)
+
+        self.filterText.textChanged.connect(self.apply_filter)
+        self.filterColumn.currentIndexChanged.connect(self.apply_filter)
+        self.resultsView.doubleClicked.connect(self.drill_down)
+        self.backButton.clicked.connect(self.show_weekly_totals)
+
+        self.drilled_employee = None
+        self.totals_date_text = ""
+        self.populate_table(weekly_run)
+
+    def populate_table(self, weekly_run):
+        # Called again after a reweight; keep whichever view the user is looking at
+        self.weekly_run = weekly_run
+        if self.drilled_employee is None:
+            self.show_weekly_totals()
+        else:
+            self.show_shift_cuts(self.drilled_employee)
+
+    def show_weekly_totals(self):
+        # The totals have no Date column, so a Date filter totals only the cuts on matching days
+        cuts = self.weekly_run.cuts
+        date_text = self.date_filter_text()
+        if date_text:
+            from results_model import matching_rows
+            cuts = cuts[matching_rows(cuts['Date'], date_text)]
+        totals = (cuts.groupby('Employee', sort=False)
+                  .agg(**{'Job Title': ('Job Title', lambda titles: ', '.join(titles.unique())),
+                          'Hours': ('Hours', 'sum'), 'Tips': ('Cut', 'sum')})
+                  .reset_index())
+        if date_text:
+            self.viewLabel.setText(f"Totals for dates matching '{date_text}' - "
+                                   "double-click an employee for their shifts")
+        else:
+            totals = totals.drop(columns='Tips')
+            totals['Weekly Tips'] = totals['Employee'].map(self.weekly_run.employee_weekly_cuts.to_series())
+            self.viewLabel.setText("Weekly totals - double-click an employee for their shifts")
+        self.totals_date_text = date_text
+        self.drilled_employee = None
+        self.backButton.setEnabled(False)
+        self.show_frame(totals)
+
+    def show_shift_cuts(self, employee):
+        cuts = self.weekly_run.cuts
+        shifts = cuts.loc[cuts['Employee'] == employee,
+                          ['Date', 'Pool', 'Employee', 'Job Title', 'Hours', 'Points', 'Value Per Point', 'Cut']]
+        self.drilled_employee = employee
+        self.backButton.setEnabled(True)
+        self.viewLabel.setText(f"Shift cuts for {employee}")
+        self.show_frame(shifts)
+
+    def show_frame(self, frame):
+        self.model.set_frame(frame)
+        self.resultsView.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.apply_filter()
+        self.resultsView.resizeColumnsToContents()
+
+    def date_filter_text(self):
+        return self.filterText.text().strip() if self.filterColumn.currentText() == "Date" else ""
+
+    def apply_filter(self):
+        if self.drilled_employee is None and self.date_filter_text() != self.totals_date_text:
+            self.show_weekly_totals()
+            return
+        self.model.set_filter(self.filterColumn.currentText(), self.filterText.text().strip())
+
+    def drill_down(self, index):
+        if self.drilled_employee is None:
+            self.show_shift_cuts(self.model.row_record(index.row())['Employee'])
+
+
+class HistoryDialog(QMainWindow):
+    """Saved runs across weeks and stores: one employee's tips, or the value per point trend."""
+
+    def __init__(self, parent=None):
+        super(HistoryDialog, self).__init__(parent)
+        import history
+        from results_model import DataFrameTableModel
+        self.history = history
+        self.setWindowTitle("Payroll History")
+        self.resize(800, 500)
+
+        self.employeeField = QLineEdit()
+        self.employeeField.setPlaceholderText("Employee")
+        self.employeeField.setCompleter(QCompleter(self.history.employees(), self))
+        self.storeDropdown = QComboBox()
+        self.storeDropdown.addItem("All Stores", "")
+        for store in self.history.stores():
+            self.storeDropdown.addItem(store or "(no store)", store)
+        self.periodDropdown = QComboBox()
+        self.periodDropdown.addItems(list(self.history.PERIODS))
+        self.periodDropdown.setCurrentText('week')
+        self.startDate = QDateEdit(QDate.currentDate().addYears(-1))
+        self.endDate = QDateEdit(QDate.currentDate())
+        for date_edit in (self.startDate, self.endDate):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("MM/dd/yyyy")
+        self.employeeButton = QPushButton("Employee Tips")
+        self.trendButton = QPushButton("Value Per Point Trend")
+        self.viewLabel = QLabel()
+
+        self.model = DataFrameTableModel(parent=self)
+        self.historyView = QTableView()
+        self.historyView.setModel(self.model)
+        self.historyView.setSortingEnabled(True)
+        self.historyView.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.historyView.horizontalHeader().setStretchLastSection(True)
+
+        query_row = QHBoxLayout()
+        for widget in (self.employeeField, self.storeDropdown, self.periodDropdown, QLabel("From"),
+                       self.startDate, QLabel("To"), self.endDate, self.employeeButton, self.trendButton):
+            query_row.addWidget(widget)
+        layout = QVBoxLayout()
+        layout.addLayout(query_row)
+        layout.addWidget(self.viewLabel)
+        layout.addWidget(self.historyView)
+        central = QWidget()
+        central.setLayout(layout)
+        self.setCentralWidget(central)
+
+        self.employeeButton.clicked.connect(self.show_employee_tips)
+        self.trendButton.clicked.connect(self.show_value_per_point_trend)
+        self.show_frame(self.history.runs(), "Saved runs")
+
+    def query_filters(self):
+        return dict(store=self.storeDropdown.currentData(), period=self.periodDropdown.currentText(),
+                    start=self.startDate.date().toPyDate(), end=self.endDate.date().toPyDate())
+
+    def show_employee_tips(self):
+        employee = self.employeeField.text().strip()
+        if not employee:
+            QMessageBox.warning(self, "No Employee", "Enter an employee name first.")
+            return
+        self.show_frame(self.history.employee_tips(employee, **self.query_filters()), f"Tips for {employee}")
+
+    def show_value_per_point_trend(self):
+        self.show_frame(self.history.value_per_point_trend(**self.query_filters()), "Value per point by pool")
+
+    def show_frame(self, frame, title):
+        self.viewLabel.setText(f"{title} ({len(frame)} rows)")
+        self.model.set_frame(frame)
+        self.historyView.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.historyView.resizeColumnsToContents()
 
 
 class MyApp(QMainWindow, Ui_MainWindow):
@@ -53,17 +222,62 @@ class MyApp(QMainWindow, Ui_MainWindow):
         # Connecting the dropdown's currentIndexChanged signal to the function
         self.pointSystemDropdown.currentIndexChanged.connect(self.update_point_system_table)
 
+        # Editing a role's points turns the table into a custom point system and recalculates live
+        self.pointsTable.cellChanged.connect(self.points_table_edited)
+
         # Connecting buttons to methods
         self.pushButton.clicked.connect(self.upload_time_entries)
         self.pushButton_2.clicked.connect(self.upload_orders)
-        self.pushButton_3.clicked.connect(self.distribute_tips_weekly)
+        self.pushButton_3.clicked.connect(self.distribute_or_cancel)
         self.pushButton_4.clicked.connect(self.show_results)  # Connect the "Show Results" button
-        self.pushButton_5.clicked.connect(self.save_results)
+        self.pushButton_5.clicked.connect(lambda: self.save_results('xlsx'))
+
+        # Parsed files are cached by content; this lets the user force a fresh parse
+        self.clearCacheAction = self.menubar.addAction("Clear Cache")
+        self.clearCacheAction.triggered.connect(self.clear_cache)
+
+        # Save Results writes an Excel workbook; these write one CSV / Parquet file per result table
+        self.exportCsvAction = self.menubar.addAction("Export CSV")
+        self.exportCsvAction.triggered.connect(lambda: self.save_results('csv'))
+        self.exportParquetAction = self.menubar.addAction("Export Parquet")
+        self.exportParquetAction.triggered.connect(lambda: self.save_results('parquet'))
+
+        # Stage timings always go to the status bar and log; memory tracing and profiling slow runs down
+        self.trackMemoryAction = self.menubar.addAction("Measure Memory")
+        self.trackMemoryAction.setCheckable(True)
+        self.profileAction = self.menubar.addAction("Profile Runs")
+        self.profileAction.setCheckable(True)
+
+        # Split pools in whole cents so each one is paid out exactly
+        self.exactCentsAction = self.menubar.addAction("Exact Cents")
+        self.exactCentsAction.setCheckable(True)
+        self.exactCentsAction.toggled.connect(self.exact_cents_toggled)
+
+        # Saved results are also kept in a local history, tagged with the store they belong to
+        self.storeAction = self.menubar.addAction("Set Store...")
+        self.storeAction.triggered.connect(self.set_store)
+        self.historyAction = self.menubar.addAction("History")
+        self.historyAction.triggered.connect(self.show_history)
+        self.store_name = ""
+        self.recorded_ledger = None  # the allocation last written to the history, so it is written once
 
         # Variables to store file paths
         self.orders_file_path = ""
         self.time_entries_file_path = ""
 
+        # Results parsed in the background right after each upload, keyed by the file they came from
+        self.orders_tip_pools = None
+        self.orders_tip_pools_path = ""
+        self.time_entries_data = None
+        self.time_entries_data_path = ""
+        self.orders_tip_pools_windows = None
+        self.time_entries_data_windows = None
+
+        # Background workers; distribute_worker is only set while a run is in progress
+        self.orders_worker = None
+        self.time_entries_worker = None
+        self.distribute_worker = None
+
         # Initialize progress bars to 0%
         self.progressBar_3.setValue(0)
         self.progressBar_2.setValue(0)
@@ -71,101 +285,363 @@ class MyApp(QMainWindow, Ui_MainWindow):
 
     def update_point_system_table(self):
         # Get the selected point system from the dropdown
-        selected_system = self.pointSystemDropdown.currentText()
-        point_system = POINT_SYSTEMS[selected_system]
+        point_system = self.current_point_system()
 
         # Update the table to reflect the roles and points of the selected system
+        self.pointsTable.blockSignals(True)  # filling the table is not a user edit
         self.pointsTable.setRowCount(len(point_system))
         for row, (role, points) in enumerate(point_system.items()):
             self.pointsTable.setItem(row, 0, QTableWidgetItem(role))
             self.pointsTable.setItem(row, 1, QTableWidgetItem(str(points)))
+        self.pointsTable.blockSignals(False)
+
+        self.recalculate_results()
+
+    def current_point_system(self):
+        return POINT_SYSTEMS[self.pointSystemDropdown.currentText()]
+
+    def current_pool_windows(self):
+        from mainWeekly import pool_windows_for
+        return pool_windows_for(self.pointSystemDropdown.currentText())
+
+    def read_points_table(self):
+        point_system = {}
+        for row in range(self.pointsTable.rowCount()):
+            role_item = self.pointsTable.item(row, 0)
+            points_item = self.pointsTable.item(row, 1)
+            if role_item is None or not role_item.text().strip():
+                continue
+            points_text = points_item.text().strip() if points_item is not None else ""
+            try:
+                point_system[role_item.text().strip()] = float(points_text) if points_text else 0
+            except ValueError:
+                raise ValueError(f"Points for '{role_item.text()}' must be a number, not '{points_text}'.")
+        return point_system
+
+    def points_table_edited(self, row, column):
+        try:
+            point_system = self.read_points_table()
+        except ValueError as e:
+            self.ErrorTracebackBox.setText(str(e))
+            return
+
+        # The edited table becomes the "Custom" point system, used by later runs as well
+        POINT_SYSTEMS[CUSTOM_POINT_SYSTEM] = point_system
+        if self.pointSystemDropdown.findText(CUSTOM_POINT_SYSTEM) == -1:
+            self.pointSystemDropdown.addItem(CUSTOM_POINT_SYSTEM)
+        self.pointSystemDropdown.blockSignals(True)  # the table already shows the custom values
+        self.pointSystemDropdown.setCurrentText(CUSTOM_POINT_SYSTEM)
+        self.pointSystemDropdown.blockSignals(False)
+
+        self.recalculate_results()
+
+    def recalculate_results(self):
+        # Re-weight the hours already loaded instead of re-running the whole pipeline
+        weekly_run = getattr(self, 'weekly_run', None)
+        if weekly_run is None:
+            return
+        if weekly_run.pool_windows != self.current_pool_windows():
+            # Different tip pools mean re-bucketing orders and hours, which needs a full run
+            self.label_6.setText(f"The {self.pointSystemDropdown.currentText()} point system uses different tip "
+                                 f"pools. Distribute Tips again to apply it.")
+            return
+        weekly_run.reweight(self.current_point_system(), self.pointSystemDropdown.currentText())
+        self.label_6.setText(f"Tips recalculated with the {self.pointSystemDropdown.currentText()} point system.")
+        self.show_reweighted(weekly_run)
+
+    def show_reweighted(self, weekly_run):
+        self.employee_weekly_cuts = weekly_run.employee_weekly_cuts
+        results_dialog = getattr(self, 'results_dialog', None)
+        if results_dialog is not None and results_dialog.isVisible():
+            results_dialog.populate_table(weekly_run)
+
+    def exact_cents_toggled(self, checked):
+        weekly_run = getattr(self, 'weekly_run', None)
+        if weekly_run is not None:
+            # Re-split the allocation already shown, even when the dropdown has moved on to a point
+            # system with other tip pools that recalculate_results cannot apply yet
+            weekly_run.exact_cents = checked
+            weekly_run.reweight(weekly_run.point_system, weekly_run.point_system_name)
+            self.show_reweighted(weekly_run)
 
     def upload_time_entries(self):
         filepath, _ = QFileDialog.getOpenFileName(self, "Select Time Entries CSV File", "",
                                                   "CSV files (*.csv);;All files (*)")
         if filepath:
             self.time_entries_file_path = filepath
-            # Read the CSV and store it as an attribute
-            self.time_entries_df, error_msg = read_csv_data(filepath)
-            if error_msg:
-                self.ErrorTracebackBox.setText(error_msg)
-                return
-            self.progressBar_3.setValue(100)  # Update the progress bar value
-            self.label_6.setText("Time entries file uploaded successfully!")
+            self.time_entries_data = None
+            self.progressBar_3.setValue(0)
+
+            from parse_cache import cached_load_time_entries
+            from workers import PipelineWorker, start_worker
+
+            self.label_6.setText("Processing time entries file...")
+
+            # Validate and parse right away so Distribute Tips only has to allocate
+            worker = PipelineWorker(cached_load_time_entries, filepath, pool_windows=self.current_pool_windows(),
+                                    point_system=self.current_point_system())
+            worker.kwargs['warn'] = worker.warning.emit
+            worker.progress.connect(self.show_time_entries_progress)
+            worker.warning.connect(self.show_time_entries_warnings)
+            worker.finished.connect(self.time_entries_loaded)
+            worker.failed.connect(self.upload_failed)
+            worker.recorder = self.new_stage_recorder('time_entries_upload')
+            self.time_entries_worker = worker
+            start_worker(self, worker)
+
+    def show_time_entries_progress(self, percent, message):
+        self.progressBar_3.setValue(percent)
+
+    def show_time_entries_warnings(self, warnings):
+        QMessageBox.warning(self, "Check Time Entries", "\n\n".join(warnings))
+
+    def time_entries_loaded(self, data):
+        # Ignore results for a file that has since been replaced by another upload
+        if self.sender() is not self.time_entries_worker:
+            return
+        self.time_entries_data = data
+        self.time_entries_data_path = self.time_entries_file_path
+        self.time_entries_data_windows = self.time_entries_worker.kwargs['pool_windows']
+        self.progressBar_3.setValue(100)  # Update the progress bar value
+        self.label_6.setText("Time entries file uploaded successfully!")
+        self.show_stage_timings(self.time_entries_worker.recorder)
 
     def upload_orders(self):
         filepath, _ = QFileDialog.getOpenFileName(self, "Select Orders CSV File", "",
                                                   "CSV files (*.csv);;All files (*)")
         if filepath:
             self.orders_file_path = filepath
-            self.progressBar_2.setValue(100)  # Update the progress bar value
-            self.label_6.setText("Orders file uploaded successfully!")
+            self.orders_tip_pools = None
+            self.progressBar_2.setValue(0)
+
+            from parse_cache import cached_load_orders
+            from workers import PipelineWorker, start_worker
+
+            self.label_6.setText("Processing orders file...")
+
+            worker = PipelineWorker(cached_load_orders, filepath, pool_windows=self.current_pool_windows())
+            worker.progress.connect(self.show_orders_progress)
+            worker.finished.connect(self.orders_loaded)
+            worker.failed.connect(self.upload_failed)
+            worker.recorder = self.new_stage_recorder('orders_upload')
+            self.orders_worker = worker
+            start_worker(self, worker)
+
+    def show_orders_progress(self, percent, message):
+        self.progressBar_2.setValue(percent)
+
+    def orders_loaded(self, tip_pools):
+        if self.sender() is not self.orders_worker:
+            return
+        self.orders_tip_pools = tip_pools
+        self.orders_tip_pools_path = self.orders_file_path
+        self.orders_tip_pools_windows = self.orders_worker.kwargs['pool_windows']
+        self.progressBar_2.setValue(100)  # Update the progress bar value
+        self.label_6.setText("Orders file uploaded successfully!")
+        self.show_stage_timings(self.orders_worker.recorder)
+
+    def distribute_or_cancel(self):
+        # While a run is in progress the Distribute Tips button doubles as Cancel
+        if self.distribute_worker is not None:
+            self.distribute_worker.cancel()
+            self.label_6.setText("Cancelling...")
+        else:
+            self.distribute_tips_weekly()
 
     def distribute_tips_weekly(self):
+        from mainWeekly import run_weekly_pipeline
+        from parse_cache import cached_load_orders, cached_load_time_entries
+        from workers import PipelineWorker, start_worker
+
+        # 1. Get the chosen point system from the dropdown
+        point_system = self.current_point_system()
+
+        # Reuse whatever the upload workers have already parsed for the current files and tip pools
+        pool_windows = self.current_pool_windows()
+        tip_pools = None
+        if self.orders_tip_pools_path == self.orders_file_path and self.orders_tip_pools_windows == pool_windows:
+            tip_pools = self.orders_tip_pools
+        time_entries = None
+        if (self.time_entries_data_path == self.time_entries_file_path
+                and self.time_entries_data_windows == pool_windows):
+            time_entries = self.time_entries_data
+
+        # 2. Run the pipeline with this point system on a background thread
+        worker = PipelineWorker(run_weekly_pipeline, self.orders_file_path, self.time_entries_file_path,
+                                point_system, tip_pools=tip_pools, time_entries=time_entries,
+                                orders_loader=cached_load_orders, time_entries_loader=cached_load_time_entries,
+                                exact_cents=self.exactCentsAction.isChecked(), pool_windows=pool_windows,
+                                point_system_name=self.pointSystemDropdown.currentText())
+        worker.kwargs['warn'] = worker.warning.emit
+        worker.progress.connect(self.show_progress)
+        worker.warning.connect(self.show_time_entries_warnings)
+        worker.finished.connect(self.distribution_finished)
+        worker.failed.connect(self.distribution_failed)
+        worker.cancelled.connect(self.distribution_cancelled)
+        worker.recorder = self.new_stage_recorder('distribute')
+        self.distribute_recorder = worker.recorder
+        self.distribute_worker = worker
+        self.progressBar.setValue(0)
+        self.pushButton_3.setText("Cancel")
+        start_worker(self, worker)
+
+    def show_progress(self, percent, message):
+        self.progressBar.setValue(percent)
+        self.label_6.setText(message)
+
+    def distribution_finished(self, weekly_run):
+        self.distribute_worker = None
+        self.pushButton_3.setText("Distribute Tips")
+        self.weekly_run = weekly_run
+        self.employee_weekly_cuts = weekly_run.employee_weekly_cuts
+        self.label_6.setText(f"Tips distributed successfully in {self.distribute_recorder.total_seconds:.2f}s!")
+        unmapped = weekly_run.hours_matrix.unmapped_roles(weekly_run.point_system)
+        if unmapped:
+            self.label_6.setText(f"{self.label_6.text()} No points for: {', '.join(unmapped)}, so those hours earn no tips.")
+        self.progressBar.setValue(100)
+        self.show_stage_timings(self.distribute_recorder)
+
+    def distribution_failed(self, error_message):
+        self.distribute_worker = None
+        self.pushButton_3.setText("Distribute Tips")
+        self.progressBar.setValue(0)
+        self.show_error(error_message)
+        self.show_stage_timings(self.distribute_recorder)
+
+    def distribution_cancelled(self):
+        self.distribute_worker = None
+        self.pushButton_3.setText("Distribute Tips")
+        self.progressBar.setValue(0)
+        self.label_6.setText("Tip distribution cancelled.")
+
+    def show_error(self, error_message):
+        self.ErrorTracebackBox.setText(error_message)
+
+    def upload_failed(self, error_message):
+        self.label_6.setText("The file could not be loaded; see the error below.")
+        self.show_error(error_message)
+
+    def new_stage_recorder(self, run_name):
+        from instrumentation import StageRecorder
+        return StageRecorder(run_name, track_memory=self.trackMemoryAction.isChecked(),
+                             profile=self.profileAction.isChecked())
+
+    def show_stage_timings(self, recorder):
+        message = recorder.summary()
+        if recorder.profile_path:
+            message += f" | profile saved to {recorder.profile_path}"
+        self.statusbar.showMessage(message)
+
+    def clear_cache(self):
         try:
-            # 1. Get the chosen point system from the dropdown
-            chosen_system = self.pointSystemDropdown.currentText()
-            point_system = POINT_SYSTEMS[chosen_system]
-
-            orders_df, error_msg = read_csv_data(self.orders_file_path)
-            if error_msg:
-                raise Exception(error_msg)
-            weekly_tip_pools = process_orders_for_week(orders_df)
-            lunch_hours_per_week, dinner_hours_per_week = process_time_entries_for_week(self.time_entries_file_path)
-            time_entries_df, error_msg = read_csv_data(self.time_entries_file_path)
-            if error_msg:
-                raise Exception(error_msg)
-
-            # 2. Pass this point system to the distribute_tips_among_employees_for_week function
-            self.employee_weekly_cuts = distribute_tips_among_employees_for_week(
-                weekly_tip_pools,
-                lunch_hours_per_week,
-                dinner_hours_per_week,
-                point_system,  # Passing the chosen point system
-                time_entries_df
-            )
-            self.label_6.setText("Tips distributed successfully!")
-            self.progressBar.setValue(100)
+            from parse_cache import invalidate
+            invalidate()
+            self.label_6.setText("Cache cleared. Files will be parsed again on the next run.")
         except Exception as e:
-            error_message = f"An error occurred: {str(e)}\n\n{traceback.format_exc()}"
-            self.ErrorTracebackBox.setText(error_message)
+            self.show_error(f"An error occurred: {str(e)}\n\n{traceback.format_exc()}")
 
     def show_results(self):
-        if hasattr(self, 'employee_weekly_cuts'):
-            self.results_dialog = ResultsDialog(self.employee_weekly_cuts, self)
+        if hasattr(self, 'weekly_run'):
+            self.results_dialog = ResultsDialog(self.weekly_run, self)
             self.results_dialog.show()
         else:
             QMessageBox.warning(self, "No Results", "Please distribute the tips first.")
 
-    def save_results(self):
+    def save_results(self, output_format='xlsx'):
+        if not hasattr(self, 'weekly_run'):
+            QMessageBox.warning(self, "No Results", "Please distribute the tips first.")
+            return
         try:
-            # Extract in-dates from the time entries dataframe
-            in_dates = self.time_entries_df['In Date'].apply(
-                lambda x: try_parsing_date(x.split()[0]))
+            import history
+            from exports import export_results
+            from workers import PipelineWorker, start_worker
 
-            # Extract the start and end dates
-            start_date = min(in_dates)
-            end_date = max(in_dates)
+            # The workers get a frozen copy: editing points or toggling Exact Cents meanwhile
+            # reweights self.weekly_run on this thread
+            weekly_run = self.weekly_run.snapshot()
+
+            # Extract the start and end dates of the distributed week
+            start_date = weekly_run.start_date
+            end_date = weekly_run.end_date
 
             # Create the filename with the desired format
-            file_name = f"PayrollResults_{start_date.strftime('%m-%d-%Y')}_to_{end_date.strftime('%m-%d-%Y')}_Created{datetime.now().strftime('%m-%d-%Y_%Hh.%Mm.%Ss')}.xlsx"
+            file_name = f"PayrollResults_{start_date.strftime('%m-%d-%Y')}_to_{end_date.strftime('%m-%d-%Y')}_Created{datetime.now().strftime('%m-%d-%Y_%Hh.%Mm.%Ss')}.{output_format}"
             output_path = os.path.join(os.path.expanduser("~"), "Downloads", file_name)
 
-            # Save the data to the Excel file
-            output_data = [{"Employee": key, "Weekly Tips": value} for key, value in self.employee_weekly_cuts.items()]
-            write_excel_data(output_path, output_data, 'EmployeeWeeklyCuts')
-
-            # Automatically open the file using the default application
-            os.startfile(output_path)
+            # Write every result sheet on a background thread so the window stays responsive
+            worker = PipelineWorker(export_results, weekly_run, output_path, output_format)
+            worker.progress.connect(self.show_progress)
+            worker.finished.connect(self.results_saved)
+            worker.failed.connect(self.show_error)
+            worker.recorder = self.new_stage_recorder('save')
+            self.save_worker = worker
+            self.label_6.setText("Saving results...")
+            start_worker(self, worker)
 
-            self.label_6.setText(f"Employee weekly cuts have been saved to {output_path}.")
+            # Record the run in the history database alongside the export, once per allocation
+            if weekly_run.ledger is not self.recorded_ledger:
+                if not self.store_name:
+                    self.set_store()
+                if not self.store_name:
+                    self.statusbar.showMessage("Not saved to history: set a store first (Set Store...).")
+                    return
+                history_worker = PipelineWorker(history.record_run, weekly_run, weekly_run.point_system_name,
+                                                self.store_name)
+                history_worker.finished.connect(self.history_recorded)
+                history_worker.failed.connect(self.history_failed)
+                self.history_worker = history_worker
+                self.recorded_ledger = weekly_run.ledger
+                start_worker(self, history_worker)
 
         except Exception as e:
             error_message = f"An error occurred: {str(e)}\n\n{traceback.format_exc()}"
             self.ErrorTracebackBox.setText(error_message)
 
+    def results_saved(self, paths):
+        self.show_stage_timings(self.save_worker.recorder)
+        if len(paths) == 1:
+            # Automatically open the file using the default application
+            os.startfile(paths[0])
+            self.label_6.setText(f"Results have been saved to {paths[0]}.")
+        else:
+            self.label_6.setText(f"Results have been saved to {os.path.dirname(paths[0])}.")
+
+    def history_recorded(self, run_id):
+        self.statusbar.showMessage(f"Run {run_id} saved to history.")
+
+    def history_failed(self, error_message):
+        self.recorded_ledger = None  # let the next save try again
+        self.show_error(error_message)
+
+    def set_store(self):
+        store, ok = QInputDialog.getText(self, "Store", "Store name for saved runs:", text=self.store_name)
+        if ok and store.strip() != self.store_name:
+            self.store_name = store.strip()
+            self.recorded_ledger = None  # the same results can be recorded again under the new store
+
+    def show_history(self):
+        try:
+            self.history_dialog = HistoryDialog(self)
+            self.history_dialog.show()
+        except Exception as e:
+            self.show_error(f"An error occurred: {str(e)}\n\n{traceback.format_exc()}")
+
+def warm_imports():
+    """Imports the pipeline modules on a background thread, so the first upload does not wait for them."""
+    def run():
+        for module_name in HEAVY_MODULES:
+            try:
+                __import__(module_name)
+            except Exception:
+                return  # the real import, on first use, reports the error
+    thread = threading.Thread(target=run, name='warm_imports', daemon=True)
+    thread.start()
+    return thread
+
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MyApp()
     window.show()
+    QTimer.singleShot(0, warm_imports)  # once the event loop has painted the window
     sys.exit(app.exec_())
@@ -0,0 +1,193 @@
+"""Headless batch mode: distributes tips for many (Orders.csv, TimeEntries.csv) jobs without the GUI.
+
+Jobs come either from a directory, where every sub-directory holding an Orders and a Time Entries
+CSV is one job, or from a manifest CSV with columns name, orders, time_entries, point_system and
+(optionally) pool_windows, naming one of POOL_WINDOWS for stores that split the day differently,
+and store, naming the store the job's run is recorded under with --history (default: the job name).
+Jobs run in parallel across a process pool; each writes its own result file and the run ends
+with a summary of timings and failures.
+
+    python batch.py exports/ --out results/ --point-system "Mocha Lux" --workers 4
+    python batch.py --manifest jobs.csv --out results/ --format csv --history
+"""
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from mainWeekly import (
+    DEFAULT_FEE_RATE,
+    POINT_SYSTEMS,
+    POOL_WINDOWS,
+    named_pool_windows,
+    pool_windows_for,
+    run_weekly_pipeline,
+    write_excel_data,
+)
+import history
+
+SUMMARY_COLUMNS = ['name', 'status', 'seconds', 'employees', 'total_tips', 'output', 'warnings', 'error']
+
+# File name patterns of the two POS exports, in order of preference
+ORDERS_PATTERNS = ['*Orders*.csv', '*orders*.csv']
+TIME_ENTRIES_PATTERNS = ['*TimeEntries*.csv', '*Time Entries*.csv', '*time_entries*.csv']
+
+
+def _find_export(directory, patterns):
+    for pattern in patterns:
+        matches = sorted(glob.glob(os.path.join(directory, pattern)))
+        if matches:
+            return matches[0]
+    return None
+
+
+def jobs_from_directory(directory, point_system_name):
+    """One job per sub-directory (or the directory itself) containing both exports."""
+    jobs = []
+    candidates = [directory] + sorted(os.path.join(directory, name) for name in os.listdir(directory))
+    for candidate in candidates:
+        if not os.path.isdir(candidate):
+            continue
+        orders = _find_export(candidate, ORDERS_PATTERNS)
+        time_entries = _find_export(candidate, TIME_ENTRIES_PATTERNS)
+        if orders and time_entries:
+            name = os.path.basename(os.path.normpath(candidate))
+            jobs.append({'name': name, 'orders': orders, 'time_entries': time_entries,
+                         'point_system': point_system_name})
+    return jobs
+
+
+def jobs_from_manifest(manifest, point_system_name):
+    """Reads name/orders/time_entries/point_system rows; relative paths are resolved against the manifest."""
+    base_dir = os.path.dirname(os.path.abspath(manifest))
+    jobs = []
+    with open(manifest, newline='') as f:
+        for index, row in enumerate(csv.DictReader(f), start=1):
+            jobs.append({
+                'name': row.get('name') or f'job{index}',
+                'orders': os.path.join(base_dir, row['orders']),
+                'time_entries': os.path.join(base_dir, row['time_entries']),
+                'point_system': row.get('point_system') or point_system_name,
+                'pool_windows': row.get('pool_windows') or None,
+                'store': row.get('store') or None,
+            })
+    return jobs
+
+
+def run_job(job, output_dir, output_format):
+    """Runs one job end to end and returns its summary row; never raises."""
+    started = time.perf_counter()
+    summary = {'name': job['name'], 'status': 'ok', 'employees': 0, 'total_tips': 0.0, 'output': '', 'warnings': '',
+               'error': ''}
+    try:
+        if job['point_system'] not in POINT_SYSTEMS:
+            raise ValueError(f"Unknown point system '{job['point_system']}'. "
+                             f"Choose one of: {', '.join(POINT_SYSTEMS)}")
+        if job.get('pool_windows'):
+            if job['pool_windows'] not in POOL_WINDOWS:
+                raise ValueError(f"Unknown pool windows '{job['pool_windows']}'. "
+                                 f"Choose one of: {', '.join(POOL_WINDOWS)}")
+            pool_windows = named_pool_windows(job['pool_windows'])
+        else:
+            pool_windows = pool_windows_for(job['point_system'])
+        warnings = []
+        weekly_run = run_weekly_pipeline(job['orders'], job['time_entries'], POINT_SYSTEMS[job['point_system']],
+                                         fee_rate=job.get('fee_rate', DEFAULT_FEE_RATE),
+                                         exact_cents=job.get('exact_cents', False), pool_windows=pool_windows,
+                                         warn=warnings.extend, point_system_name=job['point_system'])
+        summary['warnings'] = ' '.join(warnings)
+
+        output_data = [{"Employee": key, "Weekly Tips": value} for key, value in weekly_run.employee_weekly_cuts.items()]
+        output_path = os.path.join(output_dir, f"{job['name']}.{output_format}")
+        if output_format == 'csv':
+            pd.DataFrame(output_data, columns=['Employee', 'Weekly Tips']).to_csv(output_path, index=False)
+        else:
+            error_msg = write_excel_data(output_path, output_data, 'EmployeeWeeklyCuts')
+            if error_msg:
+                raise IOError(error_msg)
+
+        if job.get('history_db'):
+            history.record_run(weekly_run, weekly_run.point_system_name, job.get('store') or job['name'],
+                               db_path=job['history_db'])
+
+        summary['employees'] = len(output_data)
+        summary['total_tips'] = round(sum(weekly_run.employee_weekly_cuts.values()), 2)
+        summary['output'] = output_path
+    except Exception as e:
+        summary['status'] = 'failed'
+        summary['error'] = f"{str(e)}\n{traceback.format_exc()}"
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def run_batch(jobs, output_dir, output_format='xlsx', workers=None):
+    """Runs every job across a process pool and returns the summary rows in job order."""
+    os.makedirs(output_dir, exist_ok=True)
+    summaries = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_job, job, output_dir, output_format): job['name'] for job in jobs}
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries[futures[future]] = summary
+            print(f"[{summary['status']:>6}] {summary['name']} in {summary['seconds']:.2f}s"
+                  + (f": {summary['error'].splitlines()[0]}" if summary['error'] else ''), flush=True)
+    return [summaries[job['name']] for job in jobs]
+
+
+def write_summary(output_dir, summaries):
+    summary_path = os.path.join(output_dir, 'summary.csv')
+    pd.DataFrame(summaries, columns=SUMMARY_COLUMNS).to_csv(summary_path, index=False)
+    return summary_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distribute tips for many stores and weeks without the GUI.")
+    parser.add_argument('directory', nargs='?', help="Directory whose sub-directories each hold one job's exports")
+    parser.add_argument('--manifest', help="CSV with name, orders, time_entries, point_system and pool_windows columns")
+    parser.add_argument('--out', default='results', help="Directory for the per-job results and summary.csv")
+    parser.add_argument('--point-system', default='Mocha Red', help="Point system for jobs that do not name one")
+    parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx', help="Per-job result format")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--fee-rate', type=float, default=DEFAULT_FEE_RATE,
+                        help="Share of each tip pool kept back before splitting (default: %(default)s)")
+    parser.add_argument('--pool-windows', choices=list(POOL_WINDOWS),
+                        help="Tip pools for jobs that do not name any (default: the point system's)")
+    parser.add_argument('--exact-cents', action='store_true',
+                        help="Split in whole cents so every pool is paid out exactly")
+    parser.add_argument('--history', nargs='?', const=history.HISTORY_DB, default=None, metavar='DB',
+                        help="Also record every job's shift cuts in the history database (default: %(const)s)")
+    args = parser.parse_args(argv)
+
+    if bool(args.directory) == bool(args.manifest):
+        parser.error("Give either a directory or --manifest.")
+    if args.manifest:
+        jobs = jobs_from_manifest(args.manifest, args.point_system)
+    else:
+        jobs = jobs_from_directory(args.directory, args.point_system)
+    if not jobs:
+        parser.error("No jobs found.")
+    for job in jobs:
+        job.update(fee_rate=args.fee_rate, exact_cents=args.exact_cents, history_db=args.history)
+        job['pool_windows'] = job.get('pool_windows') or args.pool_windows
+    names = [job['name'] for job in jobs]
+    if len(set(names)) != len(names):
+        parser.error("Job names must be unique, since they name the result files.")
+
+    started = time.perf_counter()
+    summaries = run_batch(jobs, args.out, args.format, args.workers)
+    summary_path = write_summary(args.out, summaries)
+
+    failed = [summary for summary in summaries if summary['status'] != 'ok']
+    print(f"{len(summaries) - len(failed)} of {len(summaries)} jobs succeeded in "
+          f"{time.perf_counter() - started:.2f}s. Summary written to {summary_path}.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""Benchmarks each stage of the tip pipeline on synthetic exports and flags regressions.
+
+    python benchmark.py                          # small and medium sizes, compared to the baseline
+    python benchmark.py --sizes large --update-baseline
+    python benchmark.py --startup                # also time GUI startup to the first paint
+
+Each stage reports wall time and peak traced memory. A stage counts as a regression when it is
+slower or larger than its baseline by more than --tolerance (50% by default) plus a small
+absolute allowance, so noise on tiny timings does not fail the run.
+
+--startup launches app.py in fresh interpreters and times importing it and showing the main
+window up to its first paint; the best of --startup-runs launches is kept.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from generate_data import SIZES, generate_exports
+from mainWeekly import (
+    POINT_SYSTEMS,
+    distribute_tips_among_employees_for_week,
+    process_orders_for_week,
+    process_time_entries_for_week,
+    read_csv_data,
+    write_excel_data,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# Run in a fresh interpreter by measure_startup; prints the startup timings as JSON
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+from PyQt5.QtCore import QEvent, QObject, QTimer
+
+class FirstPaint(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and 'painted' not in timings:
+            timings['painted'] = time.perf_counter()
+            timings['pandas_loaded'] = 'pandas' in sys.modules
+            QTimer.singleShot(0, application.quit)
+        return False
+
+timings = {}
+application = app.QApplication(sys.argv)
+window = app.MyApp()
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+QTimer.singleShot(10000, application.quit)
+application.exec_()
+print(json.dumps({'import_app': imported - started, 'first_paint': timings.get('painted', float('nan')) - started,
+                  'pandas_loaded': timings.get('pandas_loaded')}))
+"""
+
+# Differences below these are treated as noise whatever the relative change
+MIN_SECONDS_DELTA = 0.05
+MIN_PEAK_MB_DELTA = 5.0
+
+
+def measure(func, *args):
+    """Runs func(*args) and returns (result, {'seconds': ..., 'peak_mb': ...}).
+
+    Tracing allocations slows code down several times over, so the timed run and the
+    memory-traced run are separate calls.
+    """
+    started = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {'seconds': round(seconds, 4), 'peak_mb': round(peak / (1024 * 1024), 2)}
+
+
+def run_size(size_name, work_dir, point_system_name='Mocha Red'):
+    """Generates the exports for one size and times every pipeline stage on them."""
+    data_dir = os.path.join(work_dir, size_name)
+    orders_path, time_entries_path = generate_exports(data_dir, **SIZES[size_name])
+    point_system = POINT_SYSTEMS[point_system_name]
+    results = {}
+
+    orders_df, error_msg = read_csv_data(orders_path)
+    if error_msg:
+        raise ValueError(error_msg)
+    tip_pools, results['process_orders_for_week'] = measure(process_orders_for_week, orders_df)
+    (lunch_hours, dinner_hours), results['process_time_entries_for_week'] = measure(
+        process_time_entries_for_week, time_entries_path)
+
+    time_entries_df = pd.read_csv(time_entries_path, usecols=['Employee', 'Job Title'])
+    ledger, results['distribute_tips_among_employees_for_week'] = measure(
+        distribute_tips_among_employees_for_week, tip_pools, lunch_hours, dinner_hours, point_system,
+        time_entries_df)
+    cuts = ledger.employee_cuts
+
+    output_data = [{"Employee": key, "Weekly Tips": value} for key, value in cuts.items()]
+    error_msg, results['write_excel_data'] = measure(
+        write_excel_data, os.path.join(data_dir, 'results.xlsx'), output_data, 'EmployeeWeeklyCuts')
+    if error_msg:
+        results['write_excel_data'] = {'skipped': error_msg}
+
+    results['rows'] = {'orders': len(orders_df), 'time_entries': len(time_entries_df), 'employees': len(cuts)}
+    return results
+
+
+def measure_startup(runs=3):
+    """Best-of-`runs` seconds to import app.py and to the main window's first paint."""
+    env = dict(os.environ)
+    if sys.platform.startswith('linux') and not (env.get('DISPLAY') or env.get('WAYLAND_DISPLAY')):
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    best = {}
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=app_dir, env=env, check=True,
+                                capture_output=True, text=True).stdout
+        timings = json.loads(output.strip().splitlines()[-1])
+        if timings['pandas_loaded']:
+            print("WARNING: pandas was imported before the main window painted.")
+        for stage in ('import_app', 'first_paint'):
+            best[stage] = min(best.get(stage, float('inf')), timings[stage])
+    return {stage: {'seconds': round(seconds, 4)} for stage, seconds in best.items()}
+
+
+def find_regressions(results, baseline, tolerance):
+    """Lists (size, stage, metric, baseline, current) for every metric past the tolerance."""
+    regressions = []
+    allowances = {'seconds': MIN_SECONDS_DELTA, 'peak_mb': MIN_PEAK_MB_DELTA}
+    for size_name, stages in results.items():
+        for stage, metrics in stages.items():
+            expected = baseline.get(size_name, {}).get(stage, {})
+            for metric, allowance in allowances.items():
+                if metric not in metrics or metric not in expected:
+                    continue
+                if metrics[metric] > expected[metric] * (1 + tolerance) + allowance:
+                    regressions.append((size_name, stage, metric, expected[metric], metrics[metric]))
+    return regressions
+
+
+def print_results(results):
+    for size_name, stages in results.items():
+        rows = stages.get('rows', {})
+        print(f"\n{size_name}" + (": " + ', '.join(f'{count} {name}' for name, count in rows.items()) if rows else ''))
+        for stage, metrics in stages.items():
+            if stage == 'rows':
+                continue
+            if 'skipped' in metrics:
+                print(f"  {stage:<45} skipped ({metrics['skipped'].splitlines()[0]})")
+            elif 'peak_mb' not in metrics:
+                print(f"  {stage:<45} {metrics['seconds']:>9.3f}s")
+            else:
+                print(f"  {stage:<45} {metrics['seconds']:>9.3f}s {metrics['peak_mb']:>9.1f} MB peak")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the tip pipeline stages on synthetic data.")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small', 'medium'])
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Allowed relative slowdown, e.g. 0.5 for 50%%")
+    parser.add_argument('--update-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--startup', action='store_true', help="Also time GUI startup to the first paint")
+    parser.add_argument('--startup-runs', type=int, default=3, help="Launches to take the best startup time of")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = {size_name: run_size(size_name, work_dir) for size_name in args.sizes}
+    if args.startup:
+        results['startup'] = measure_startup(args.startup_runs)
+    print_results(results)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline updated in {args.baseline}.")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for size_name, stage, metric, expected, actual in regressions:
+        print(f"REGRESSION {size_name} {stage} {metric}: {expected} -> {actual}")
+    if not regressions:
+        print("\nNo regressions against the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
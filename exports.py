@@ -0,0 +1,125 @@
+import os
+
+import pandas as pd
+
+from mainWeekly import check_cancelled, pipeline_stage, report_progress
+
+# xlsxwriter's constant-memory mode is the fastest streaming writer; openpyxl's write-only mode
+# is the fallback, since openpyxl is already needed for write_excel_data
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+EXPORT_FORMATS = ('xlsx', 'csv', 'parquet')
+
+# Excel's row limit; longer tables continue on "<sheet> (2)", "<sheet> (3)", ...
+EXCEL_MAX_ROWS = 1048576
+
+# Progress is reported, and cancellation checked, every this many rows
+ROWS_PER_PROGRESS_STEP = 20000
+
+
+def result_tables(weekly_run):
+    """The sheets of a full export: weekly totals, per (date, pool) cuts, pool totals and hours by role."""
+    cuts = weekly_run.cuts
+    weekly_totals = weekly_run.ledger.total('employee').rename('Weekly Tips').reset_index()
+    hours_by_role = (cuts.groupby(['Date', 'Pool', 'Job Title'], sort=True)
+                     .agg(Employees=('Employee', 'nunique'), Hours=('Hours', 'sum'), Cuts=('Cut', 'sum'))
+                     .reset_index())
+    return {
+        'Weekly Totals': weekly_totals,
+        'Shift Cuts': cuts[['Date', 'Pool', 'Employee', 'Job Title', 'Hours', 'Points', 'Cut']],
+        'Pool Totals': weekly_run.ledger.pool_summary(),
+        'Hours By Role': hours_by_role,
+    }
+
+
+def _sheet_parts(sheet_name, df):
+    rows_per_sheet = EXCEL_MAX_ROWS - 1  # one row goes to the header
+    for part, start in enumerate(range(0, max(len(df), 1), rows_per_sheet)):
+        name = sheet_name if part == 0 else f"{sheet_name} ({part + 1})"
+        yield name, df.iloc[start:start + rows_per_sheet]
+
+
+class _RowProgress(object):
+    def __init__(self, total_rows, progress, should_cancel):
+        self.total_rows = max(total_rows, 1)
+        self.done = 0
+        self.progress = progress
+        self.should_cancel = should_cancel
+
+    def step(self, rows=1):
+        before = self.done // ROWS_PER_PROGRESS_STEP
+        self.done += rows
+        if self.done // ROWS_PER_PROGRESS_STEP != before:
+            check_cancelled(self.should_cancel)
+            report_progress(self.progress, self.done * 100 / self.total_rows, "Saving results...")
+
+
+def _write_xlsx(path, tables, row_progress):
+    if xlsxwriter is not None:
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'default_date_format': 'mm/dd/yyyy',
+                                              'nan_inf_to_errors': True})
+        try:
+            for sheet_name, df in tables.items():
+                for name, part in _sheet_parts(sheet_name, df):
+                    worksheet = workbook.add_worksheet(name)
+                    worksheet.write_row(0, 0, list(part.columns))
+                    for row_number, row in enumerate(part.itertuples(index=False, name=None), start=1):
+                        worksheet.write_row(row_number, 0, row)
+                        row_progress.step()
+        finally:
+            workbook.close()
+        return
+
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    for sheet_name, df in tables.items():
+        for name, part in _sheet_parts(sheet_name, df):
+            worksheet = workbook.create_sheet(name)
+            worksheet.append(list(part.columns))
+            for row in part.astype(object).where(part.notna(), None).itertuples(index=False, name=None):
+                worksheet.append(row)
+                row_progress.step()
+    workbook.save(path)
+
+
+def _table_path(path, sheet_name, extension):
+    base, _ = os.path.splitext(path)
+    return f"{base}_{sheet_name.replace(' ', '')}.{extension}"
+
+
+def export_results(weekly_run, path, output_format='xlsx', progress=None, should_cancel=None):
+    """Writes every result table of a WeeklyRun and returns the paths written.
+
+    xlsx writes one workbook with a sheet per table, streamed row by row so memory stays flat.
+    csv and parquet write one file per table next to `path`, e.g. Payroll_WeeklyTotals.csv.
+    """
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{output_format}'. Choose one of: {', '.join(EXPORT_FORMATS)}")
+
+    with pipeline_stage('export') as stage:
+        tables = result_tables(weekly_run)
+        stage['rows'] = sum(len(df) for df in tables.values())
+        row_progress = _RowProgress(stage['rows'], progress, should_cancel)
+
+        if output_format == 'xlsx':
+            _write_xlsx(path, tables, row_progress)
+            paths = [path]
+        else:
+            paths = []
+            for sheet_name, df in tables.items():
+                table_path = _table_path(path, sheet_name, output_format)
+                if output_format == 'csv':
+                    df.to_csv(table_path, index=False)
+                else:
+                    # Parquet has no plain date type in pandas; store the day as a timestamp
+                    if 'Date' in df.columns:
+                        df = df.assign(Date=pd.to_datetime(df['Date']))
+                    df.to_parquet(table_path, index=False)
+                row_progress.step(len(df))
+                paths.append(table_path)
+
+    report_progress(progress, 100, "Results saved.")
+    return paths
@@ -0,0 +1,117 @@
+"""Writes synthetic Orders.csv and TimeEntries.csv exports for benchmarking the tip pipeline.
+
+    python generate_data.py out/ --stores 5 --days 28 --employees 100 --timestamp-format mixed
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from mainWeekly import POINT_SYSTEMS, TIMESTAMP_FORMATS
+
+# Ready-made sizes, from a single small store's week up to a year of a 50-store group
+SIZES = {
+    'small': {'stores': 1, 'days': 7, 'employees': 10},
+    'medium': {'stores': 5, 'days': 28, 'employees': 150},
+    'large': {'stores': 20, 'days': 91, 'employees': 600},
+    'xlarge': {'stores': 50, 'days': 365, 'employees': 2000},
+}
+
+# Which of TIMESTAMP_FORMATS each --timestamp-format choice writes
+FORMAT_CHOICES = {'24h': [TIMESTAMP_FORMATS[0]], '12h': [TIMESTAMP_FORMATS[1]], 'mixed': list(TIMESTAMP_FORMATS)}
+
+ORDERS_PER_STORE_DAY = 250
+SHIFTS_PER_EMPLOYEE_WEEK = 5
+
+
+def _format_timestamps(timestamps, formats, rng):
+    """Formats datetime64 values with the chosen POS timestamp format(s), picked at random per row."""
+    timestamps = pd.Series(timestamps)
+    text = timestamps.dt.strftime(formats[0])
+    if len(formats) > 1:
+        use_second = rng.random(len(timestamps)) < 0.5
+        text[use_second] = timestamps[use_second].dt.strftime(formats[1])
+    return text
+
+
+def generate_orders(stores, days, start_date, formats, rng):
+    """Orders clustered around lunch and dinner, with some dinner checks opened after midnight."""
+    count = rng.poisson(ORDERS_PER_STORE_DAY * stores * days)
+    day_offsets = rng.integers(0, days, count)
+    is_dinner = rng.random(count) < 0.6
+    minutes = np.where(is_dinner,
+                       rng.normal(20.5 * 60, 150, count),   # dinner peaks around 20:30, tails past midnight
+                       rng.normal(12.75 * 60, 75, count))   # lunch peaks around 12:45
+    minutes = np.clip(minutes, 7 * 60, 26 * 60).astype('int64')
+    opened = (np.datetime64(start_date, 'm') + day_offsets.astype('timedelta64[D]')
+              + minutes.astype('timedelta64[m]'))
+
+    tips = np.round(rng.gamma(2.0, 6.0, count), 2)
+    gratuity = np.where(rng.random(count) < 0.1, np.round(rng.gamma(3.0, 15.0, count), 2), 0.0)
+    return pd.DataFrame({'Opened': _format_timestamps(opened, formats, rng), 'Tip': tips, 'Gratuity': gratuity})
+
+
+def generate_time_entries(stores, days, employees, start_date, formats, rng, point_system_name='Mocha Red'):
+    """About five shifts a week per employee: lunch, dinner (often past midnight) or doubles."""
+    names = np.array([f'Store{index % stores + 1:02d} Employee{index + 1:04d}' for index in range(employees)])
+    roles = np.array(list(POINT_SYSTEMS[point_system_name]))
+    employee_roles = roles[rng.integers(0, len(roles), len(names))]
+
+    worked = rng.random((len(names), days)) < SHIFTS_PER_EMPLOYEE_WEEK / 7
+    employee_index, day_offsets = np.nonzero(worked)
+    count = len(employee_index)
+
+    shift_kind = rng.integers(0, 3, count)  # 0 lunch, 1 dinner, 2 double
+    start_minutes = np.select([shift_kind == 0, shift_kind == 1], [10 * 60, 16 * 60], 10 * 60)
+    start_minutes = start_minutes + rng.integers(-30, 31, count)
+    length_minutes = np.select([shift_kind == 0, shift_kind == 1], [6 * 60, 8 * 60], 13 * 60)
+    length_minutes = length_minutes + rng.integers(-60, 121, count)
+
+    clock_in = (np.datetime64(start_date, 'm') + day_offsets.astype('timedelta64[D]')
+                + start_minutes.astype('timedelta64[m]'))
+    clock_out = clock_in + length_minutes.astype('timedelta64[m]')
+    return pd.DataFrame({
+        'Employee': names[employee_index],
+        'Job Title': employee_roles[employee_index],
+        'In Date': _format_timestamps(clock_in, formats, rng),
+        'Out Date': _format_timestamps(clock_out, formats, rng),
+    })
+
+
+def generate_exports(output_dir, stores=1, days=7, employees=10, timestamp_format='mixed', start_date='2024-01-01',
+                     seed=0):
+    """Writes Orders.csv and TimeEntries.csv into output_dir and returns their paths."""
+    rng = np.random.default_rng(seed)
+    formats = FORMAT_CHOICES[timestamp_format]
+    os.makedirs(output_dir, exist_ok=True)
+
+    orders_path = os.path.join(output_dir, 'Orders.csv')
+    time_entries_path = os.path.join(output_dir, 'TimeEntries.csv')
+    generate_orders(stores, days, start_date, formats, rng).to_csv(orders_path, index=False)
+    generate_time_entries(stores, days, employees, start_date, formats, rng).to_csv(time_entries_path, index=False)
+    return orders_path, time_entries_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic POS exports for benchmarking.")
+    parser.add_argument('output_dir')
+    parser.add_argument('--size', choices=list(SIZES), help="Preset size; overrides --stores/--days/--employees")
+    parser.add_argument('--stores', type=int, default=1)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--employees', type=int, default=10, help="Employees across all stores")
+    parser.add_argument('--timestamp-format', choices=list(FORMAT_CHOICES), default='mixed')
+    parser.add_argument('--start-date', default='2024-01-01')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    size = SIZES[args.size] if args.size else {'stores': args.stores, 'days': args.days, 'employees': args.employees}
+    paths = generate_exports(args.output_dir, timestamp_format=args.timestamp_format, start_date=args.start_date,
+                             seed=args.seed, **size)
+    print('Wrote ' + ' and '.join(paths))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
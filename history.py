@@ -0,0 +1,186 @@
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from mainWeekly import check_cancelled, pipeline_stage, report_progress
+
+# Every saved run's per-shift cuts are kept here for history and trend queries
+HISTORY_DB = os.path.join(os.path.expanduser("~"), ".mygrat", "history.sqlite3")
+
+# Rows inserted between progress reports / cancellation checks
+ROWS_PER_INSERT_BATCH = 20000
+
+# strftime patterns for the periods results can be grouped by
+PERIODS = {'day': '%Y-%m-%d', 'week': '%Y-W%W', 'month': '%Y-%m', 'year': '%Y'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    store TEXT NOT NULL,
+    point_system TEXT NOT NULL,
+    start_date TEXT,
+    end_date TEXT,
+    fee_rate REAL,
+    exact_cents INTEGER
+);
+CREATE TABLE IF NOT EXISTS shifts (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    store TEXT NOT NULL,
+    date TEXT NOT NULL,
+    pool TEXT NOT NULL,
+    employee TEXT NOT NULL,
+    role TEXT NOT NULL,
+    hours REAL NOT NULL,
+    points REAL NOT NULL,
+    value_per_point REAL NOT NULL,
+    cut REAL NOT NULL,
+    point_system TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pools (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    store TEXT NOT NULL,
+    date TEXT NOT NULL,
+    pool TEXT NOT NULL,
+    tip_pool REAL NOT NULL,
+    distributable REAL NOT NULL,
+    weighted_hours REAL NOT NULL,
+    value_per_point REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS shifts_employee_date ON shifts (employee, date);
+CREATE INDEX IF NOT EXISTS shifts_date ON shifts (date);
+CREATE INDEX IF NOT EXISTS shifts_store_date ON shifts (store, date);
+CREATE INDEX IF NOT EXISTS pools_store_pool_date ON pools (store, pool, date);
+CREATE INDEX IF NOT EXISTS pools_date ON pools (date);
+"""
+
+
+def connect(db_path=HISTORY_DB):
+    """Opens (creating if needed) the history database."""
+    if db_path != ':memory:':
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    # Batch jobs record from several processes at once; writers wait their turn rather than fail
+    connection = sqlite3.connect(db_path, timeout=60)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def _day(value):
+    return None if value is None else value.isoformat()
+
+
+def record_run(weekly_run, point_system_name, store, db_path=HISTORY_DB, progress=None, should_cancel=None):
+    """Stores a WeeklyRun's per-shift cuts and per-pool totals in one transaction; returns the new run_id.
+
+    A store holds one allocation per day: saving a run replaces whatever an earlier run stored for
+    the same store and dates, so re-running a week never double counts it. Runs left with no days
+    are removed too. The store must be named, so one location's week never replaces another's.
+    """
+    if not store:
+        raise ValueError("A store name is needed to record a run in the history.")
+    cuts = weekly_run.cuts
+    with pipeline_stage('record_history') as stage:
+        stage['rows'] = len(cuts)
+        pools = weekly_run.ledger.pool_summary()
+        dates = pd.Series(cuts['Date'].map(_day).to_numpy())
+        pool_dates = pools['Date'].map(_day)
+        rows = zip([store] * len(cuts), dates, cuts['Pool'], cuts['Employee'], cuts['Job Title'],
+                   cuts['Hours'].tolist(), cuts['Points'].tolist(), cuts['Value Per Point'].tolist(),
+                   cuts['Cut'].tolist(), [point_system_name] * len(cuts))
+
+        connection = connect(db_path)
+        try:
+            with connection:  # one transaction: either the whole run is stored or none of it
+                # Pools with tips but no hours have days of their own
+                replaced = [(store, day) for day in set(dates) | set(pool_dates)]
+                connection.executemany("DELETE FROM shifts WHERE store = ? AND date = ?", replaced)
+                connection.executemany("DELETE FROM pools WHERE store = ? AND date = ?", replaced)
+                connection.execute("DELETE FROM runs WHERE store = ? AND run_id NOT IN "
+                                   "(SELECT DISTINCT run_id FROM pools WHERE store = ?)", (store, store))
+                run_id = connection.execute(
+                    "INSERT INTO runs (created_at, store, point_system, start_date, end_date, fee_rate, exact_cents) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (datetime.now().isoformat(timespec='seconds'), store, point_system_name,
+                     _day(weekly_run.start_date), _day(weekly_run.end_date), weekly_run.fee_rate,
+                     int(weekly_run.exact_cents))).lastrowid
+
+                connection.executemany("INSERT INTO pools VALUES (?, ?, ?, ?, ?, ?, ?, ?)", zip(
+                    [run_id] * len(pools), [store] * len(pools), pool_dates, pools['Pool'],
+                    pools['Tip Pool'].tolist(), pools['Distributable'].tolist(), pools['Weighted Hours'].tolist(),
+                    pools['Value Per Point'].tolist()))
+
+                inserted = 0
+                while True:
+                    batch = [(run_id,) + row for _, row in zip(range(ROWS_PER_INSERT_BATCH), rows)]
+                    if not batch:
+                        break
+                    check_cancelled(should_cancel)
+                    connection.executemany("INSERT INTO shifts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                    inserted += len(batch)
+                    report_progress(progress, inserted * 100 / max(len(cuts), 1), "Saving to history...")
+        finally:
+            connection.close()
+    report_progress(progress, 100, "Run saved to history.")
+    return run_id
+
+
+def _filters(employee=None, store=None, pool=None, start=None, end=None):
+    clauses, params = [], []
+    for column, value in (('employee', employee), ('store', store), ('pool', pool)):
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if start is not None:
+        clauses.append("date >= ?")
+        params.append(_day(start))
+    if end is not None:
+        clauses.append("date <= ?")
+        params.append(_day(end))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def query(sql, params=(), db_path=HISTORY_DB):
+    """Runs any read-only SQL against the history and returns a DataFrame."""
+    connection = connect(db_path)
+    try:
+        return pd.read_sql_query(sql, connection, params=list(params))
+    finally:
+        connection.close()
+
+
+def employee_tips(employee, start=None, end=None, store=None, period='week', db_path=HISTORY_DB):
+    """One employee's hours and tips per period (day, week, month or year)."""
+    where, params = _filters(employee=employee, store=store, start=start, end=end)
+    return query(f"SELECT strftime(?, date) AS period, store AS Store, SUM(hours) AS Hours, SUM(cut) AS Tips, "
+                 f"COUNT(*) AS Shifts FROM shifts{where} GROUP BY period, store ORDER BY period, store",
+                 [PERIODS[period]] + params, db_path)
+
+
+def value_per_point_trend(pool=None, store=None, start=None, end=None, period='week', db_path=HISTORY_DB):
+    """Value per point per store, pool and period, weighted by the points earned in each pool.
+
+    Reads the per-pool totals rather than the shifts, so a trend over years touches a few thousand rows.
+    Pools nobody earned points in distributed nothing and are left out.
+    """
+    where, params = _filters(store=store, pool=pool, start=start, end=end)
+    where += (" AND " if where else " WHERE ") + "weighted_hours > 0"
+    return query(f"SELECT strftime(?, date) AS period, store AS Store, pool AS Pool, "
+                 f"SUM(distributable) / NULLIF(SUM(weighted_hours), 0) AS 'Value Per Point', "
+                 f"SUM(tip_pool) AS Tips FROM pools{where} GROUP BY period, store, pool ORDER BY period, store, pool",
+                 [PERIODS[period]] + params, db_path)
+
+
+def stores(db_path=HISTORY_DB):
+    return query("SELECT DISTINCT store FROM pools ORDER BY store", db_path=db_path)['store'].tolist()
+
+
+def employees(db_path=HISTORY_DB):
+    return query("SELECT DISTINCT employee FROM shifts ORDER BY employee", db_path=db_path)['employee'].tolist()
+
+
+def runs(db_path=HISTORY_DB):
+    return query("SELECT * FROM runs ORDER BY run_id DESC", db_path=db_path)
@@ -0,0 +1,179 @@
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from mainWeekly import set_stage_recorder
+
+# Every instrumented run appends one JSON line per stage here
+LOG_PATH = os.path.join(os.path.expanduser("~"), ".mygrat", "pipeline_log.jsonl")
+
+# cProfile dumps (open with snakeviz, or convert with flameprof / gprof2dot for a flame graph)
+PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".mygrat", "profiles")
+
+# tracemalloc and the profiler hook are process-wide, while recorders run one per thread; this
+# counts the recorders tracking memory and marks whether one of them holds the profiler
+_process_lock = threading.Lock()
+_memory_recorders = 0
+_memory_started_tracing = False
+_memory_epoch = 0  # bumped whenever a memory-tracking recorder starts
+_profiler_in_use = False
+
+# How much of a stage's peak_mb is its own: 'stage' exactly, 'enclosing' includes the stage it is
+# nested in, 'shared' includes other threads' runs. A stage keeps the broadest scope it was seen with.
+PEAK_SCOPES = ('stage', 'enclosing', 'shared')
+
+
+class StageRecorder(object):
+    """Collects wall time, row counts and (optionally) peak memory for each pipeline stage of one run.
+
+    Use as a context manager on the thread that runs the pipeline:
+
+        with StageRecorder('distribute') as recorder:
+            run_weekly_pipeline(...)
+        print(recorder.summary())
+
+    Stages repeated per chunk are summed under one name. On exit the stages are appended to the
+    JSON lines log and, when profiling, a cProfile dump is written.
+
+    Memory can be tracked by several recorders at once. Stages then report the process-wide peak
+    and peak_scope says so; see PEAK_SCOPES. Only one recorder profiles at a time; others run
+    without a profile.
+    """
+
+    def __init__(self, run_name, track_memory=False, profile=False, log_path=LOG_PATH, profile_dir=PROFILE_DIR):
+        self.run_name = run_name
+        self.track_memory = track_memory
+        self.profile = profile
+        self.log_path = log_path
+        self.profile_dir = profile_dir
+        self.stages = {}
+        self.started_at = None
+        self.total_seconds = 0.0
+        self.status = 'running'
+        self.profile_path = None
+        self._started = None
+        self._profiler = None
+        self._depth = 0
+
+    @contextmanager
+    def stage(self, name):
+        record = self.stages.setdefault(name, {'seconds': 0.0, 'rows': 0, 'calls': 0, 'peak_mb': None,
+                                               'peak_scope': None})
+        info = {}
+        if self.track_memory:
+            with _process_lock:
+                epoch = _memory_epoch
+                if _memory_recorders > 1:
+                    scope = 'shared'
+                elif self._depth > 0:
+                    scope = 'enclosing'  # resetting here would wipe the enclosing stage's peak
+                else:
+                    scope = 'stage'
+                    tracemalloc.reset_peak()
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self._depth -= 1
+            record['seconds'] += time.perf_counter() - started
+            record['rows'] += info.get('rows', 0)
+            record['calls'] += 1
+            if self.track_memory:
+                with _process_lock:
+                    if _memory_epoch != epoch or _memory_recorders > 1:
+                        scope = 'shared'  # another run started tracking memory during this stage
+                    peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                record['peak_mb'] = max(record['peak_mb'] or 0.0, peak_mb)
+                record['peak_scope'] = max(record['peak_scope'] or scope, scope, key=PEAK_SCOPES.index)
+
+    def __enter__(self):
+        global _memory_recorders, _memory_started_tracing, _memory_epoch, _profiler_in_use
+        self.started_at = datetime.now()
+        with _process_lock:
+            if self.track_memory:
+                if _memory_recorders == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _memory_started_tracing = True
+                _memory_recorders += 1
+                _memory_epoch += 1
+            if self.profile and not _profiler_in_use:
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:
+                    pass  # another profiler (e.g. a debugger's) is already active
+                else:
+                    self._profiler = profiler
+                    _profiler_in_use = True
+        self._started = time.perf_counter()
+        set_stage_recorder(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        global _memory_recorders, _memory_started_tracing, _profiler_in_use
+        set_stage_recorder(None)
+        self.total_seconds = time.perf_counter() - self._started
+        with _process_lock:
+            if self.track_memory:
+                _memory_recorders -= 1
+                # Only the last recorder out stops tracing, and only if a recorder started it
+                if _memory_recorders == 0 and _memory_started_tracing:
+                    tracemalloc.stop()
+                    _memory_started_tracing = False
+            if self._profiler is not None:
+                self._profiler.disable()
+                _profiler_in_use = False
+        self.status = 'ok' if exc_type is None else exc_type.__name__
+
+        # The log and profile are diagnostics only and must never fail a run
+        if self._profiler is not None:
+            try:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profile_path = os.path.join(
+                    self.profile_dir, f"{self.run_name}-{self.started_at.strftime('%Y%m%d-%H%M%S')}.prof")
+                self._profiler.dump_stats(profile_path)
+                self.profile_path = profile_path
+            except OSError:
+                pass
+        try:
+            self.append_to_log()
+        except OSError:
+            pass
+        return False
+
+    def records(self):
+        """One JSON-ready dict per stage, in the order the stages first ran."""
+        base = {'run': self.run_name, 'started_at': self.started_at.isoformat(timespec='seconds'),
+                'status': self.status, 'total_seconds': round(self.total_seconds, 4)}
+        records = []
+        for name, stage in self.stages.items():
+            record = dict(base, stage=name, seconds=round(stage['seconds'], 4), rows=stage['rows'],
+                          calls=stage['calls'])
+            record['peak_mb'] = None if stage['peak_mb'] is None else round(stage['peak_mb'], 2)
+            record['peak_scope'] = stage['peak_scope']
+            records.append(record)
+        return records
+
+    def append_to_log(self):
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        with open(self.log_path, 'a') as f:
+            for record in self.records():
+                f.write(json.dumps(record) + '\n')
+
+    def summary(self):
+        """Short one-line breakdown for a status bar, slowest stages first."""
+        parts = []
+        for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]['seconds']):
+            part = f"{name} {stage['seconds']:.2f}s"
+            if stage['peak_mb'] is not None:
+                part += f" / {stage['peak_mb']:.0f} MB"
+                if stage['peak_scope'] == 'shared':
+                    part += " (shared)"
+            parts.append(part)
+        return f"{self.total_seconds:.2f}s total: " + ', '.join(parts)
@@ -1,48 +1,112 @@
+import copy
+import hashlib
+import itertools
+import os
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-
-# New: Define the different point systems
-POINT_SYSTEMS = {
-    "Mocha Red": {
-        'Head Bartender': 1.25,
-        'Bartender': 1,
-        'Captain': 1,
-        'Expeditor': 1,
-        'Server': 1,
-        'Head Barback': 0.7,
-        'Runner': 0.7,
-        'Barback': 0.5,
-        'Busser': 0.5,
-        'Maitre\'D': 0.2,
-        'General Manager': 0,
-        'Manager': 0,
-        'Training': 0
-    },
-    "Mocha Lux": {
-        'Captain': 8,
-        'Lead Bartender': 8,
-        'Bartender': 6,
-        'Server': 6,
-        'Expeditor': 5,
-        'Runner': 4,
-        'Barback': 3.5,
-        'Busser': 3.5,
-        'Polisher': 2,
-        'Beverage Manager': 0,
-        'General Manager': 0,
-        'GeneralManager': 0,
-        'Host': 0,
-        'OLO_GS': 0,
-        'Shift Manager / Assistant Manager': 0,
-        'Training': 0
-    }
-}
-
-# Reference the default system for backward compatibility
-role_pool_points = POINT_SYSTEMS["Mocha Red"]
+from datetime import datetime
+
+from point_systems import (  # re-exported: callers have always imported these from mainWeekly
+    CLOCK_IN_DAY_POOL_WINDOWS,
+    DEFAULT_FEE_RATE,
+    DEFAULT_POOL_WINDOWS,
+    POINT_SYSTEM_POOL_WINDOWS,
+    POINT_SYSTEMS,
+    POOL_WINDOWS,
+    role_pool_points,
+)
+
+# Upper bound on (entries x scenarios) values held at once while comparing point systems
+SCENARIO_BLOCK_VALUES = 4000000
+
+
+def sweep_point_system(base_name, role_values, base_system=None):
+    """Builds what-if variants of a point system for compare_point_systems.
+
+    role_values maps each role to the points to try, e.g. {'Runner': [0.6, 0.7, 0.8]}; every
+    combination becomes one scenario named like "Mocha Red | Runner=0.8".
+    """
+    base_system = POINT_SYSTEMS[base_name] if base_system is None else base_system
+    roles = list(role_values)
+    scenarios = {}
+    for values in itertools.product(*(role_values[role] for role in roles)):
+        point_system = dict(base_system)
+        point_system.update(zip(roles, values))
+        label = ', '.join(f'{role}={value:g}' for role, value in zip(roles, values))
+        scenarios[f'{base_name} | {label}'] = point_system
+    return scenarios
+
+
+class PipelineCancelled(Exception):
+    """Raised between pipeline stages when the caller asked the run to stop."""
+
+
+def report_progress(progress, percent, message):
+    if progress is not None:
+        progress(int(percent), message)
+
+
+def check_cancelled(should_cancel):
+    if should_cancel is not None and should_cancel():
+        raise PipelineCancelled("The run was cancelled.")
+
+
+# The StageRecorder (see instrumentation.py) collecting stage timings on each thread, if any
+_stage_recorders = threading.local()
+
+
+def set_stage_recorder(recorder):
+    """Installs (or with None, removes) the recorder that pipeline_stage reports to on this thread."""
+    _stage_recorders.current = recorder
+
+
+@contextmanager
+def pipeline_stage(name):
+    """Marks a block of pipeline work as a named stage for the current thread's StageRecorder.
+
+    Yields a dict the block can fill with 'rows'; without a recorder this costs next to nothing.
+    """
+    recorder = getattr(_stage_recorders, 'current', None)
+    if recorder is None:
+        yield {}
+    else:
+        with recorder.stage(name) as stage:
+            yield stage
+
+
+def scaled_progress(progress, start, end):
+    """Maps a stage's own 0-100 progress onto the start-end slice of the overall run."""
+    if progress is None:
+        return None
+    return lambda percent, message: progress(int(start + (end - start) * percent / 100), message)
+
+
+# Timestamp formats found in the POS exports, in the order they are tried
+TIMESTAMP_FORMATS = ('%m/%d/%Y %H:%M', '%m/%d/%y %I:%M %p')
+
+# Bump whenever parsing or aggregation changes, so results cached by older versions are not reused
+PARSER_VERSION = 3
+
+# Only these columns are read from each export, with compact dtypes; names and roles repeat heavily
+ORDERS_DTYPES = {'Opened': str, 'Tip': 'float64', 'Gratuity': 'float64'}
+TIME_ENTRIES_DTYPES = {'Employee': 'category', 'Job Title': 'category', 'In Date': str, 'Out Date': str}
+
+# Rows read at a time when streaming an export, which bounds peak memory regardless of file size
+DEFAULT_CHUNKSIZE = 100000
+
+# How many failing values are quoted in a parse error before it is truncated
+MAX_REPORTED_PARSE_ERRORS = 10
+
+# Rows read from the top of an export to validate it before the full load
+VALIDATION_SAMPLE_ROWS = 5000
+
 
 def try_parsing_date(text):
-    for fmt in ('%m/%d/%Y %H:%M', '%m/%d/%y %I:%M %p'):
+    for fmt in TIMESTAMP_FORMATS:
         try:
             return datetime.strptime(text, fmt)
         except ValueError:
@@ -50,6 +114,148 @@ def try_parsing_date(text):
     raise ValueError(f'time data {text} does not match any of the expected formats')
 
 
+def detect_timestamp_format(values):
+    """Returns the first entry of TIMESTAMP_FORMATS that parses the first non-empty value, or None."""
+    for text in values:
+        if isinstance(text, str) and text.strip():
+            for fmt in TIMESTAMP_FORMATS:
+                try:
+                    datetime.strptime(text.strip(), fmt)
+                    return fmt
+                except ValueError:
+                    pass
+            return None
+    return None
+
+
+def parse_timestamp_column(series, column_name=None):
+    """Converts a column of POS timestamp strings to datetime64 in one pass.
+
+    The format is detected once from the column; rows it cannot parse are retried with the
+    remaining formats, so files that mix both exports still load. Every row that matches no
+    format is reported together in a single ValueError.
+    """
+    with pipeline_stage('parse_timestamps') as stage:
+        stage['rows'] = len(series)
+        text = series.astype(str).str.strip()
+        detected = detect_timestamp_format(text)
+        formats = [detected] + [fmt for fmt in TIMESTAMP_FORMATS if fmt != detected] if detected else list(TIMESTAMP_FORMATS)
+
+        parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+        for fmt in formats:
+            missing = parsed.isna()
+            if not missing.any():
+                break
+            parsed[missing] = pd.to_datetime(text[missing], format=fmt, errors='coerce')
+
+    failed = parsed.isna()
+    if failed.any():
+        bad_rows = series[failed]
+        examples = ', '.join(f'row {index}: {value!r}' for index, value in bad_rows.head(MAX_REPORTED_PARSE_ERRORS).items())
+        if len(bad_rows) > MAX_REPORTED_PARSE_ERRORS:
+            examples += f', ... ({len(bad_rows) - MAX_REPORTED_PARSE_ERRORS} more)'
+        label = f"'{column_name or series.name}'"
+        raise ValueError(f'{len(bad_rows)} value(s) in the {label} column do not match any of the expected '
+                         f'timestamp formats: {examples}')
+    return parsed
+
+
+def _quoted(values):
+    values = list(values)
+    quoted = ', '.join(repr(value) for value in values[:MAX_REPORTED_PARSE_ERRORS])
+    if len(values) > MAX_REPORTED_PARSE_ERRORS:
+        quoted += f', ... ({len(values) - MAX_REPORTED_PARSE_ERRORS} more)'
+    return quoted
+
+
+def read_validation_sample(filename, dtypes, problems, nrows=VALIDATION_SAMPLE_ROWS):
+    """Reads the header and first rows of an export as text; returns None after noting any missing column."""
+    try:
+        header = pd.read_csv(filename, nrows=0).columns
+    except Exception as e:
+        problems.append(f"The file could not be read as CSV: {e}")
+        return None
+    missing = [column for column in dtypes if column not in header]
+    if missing:
+        problems.append(f"Missing required column(s) {_quoted(missing)}. Columns found: {_quoted(header)}.")
+        return None
+    return pd.read_csv(filename, usecols=list(dtypes), dtype=str, nrows=nrows)
+
+
+def _check_timestamps(sample, column, problems):
+    values = sample[column].dropna()
+    if len(values) and detect_timestamp_format(values) is None:
+        problems.append(f"'{column}' values such as {values.iloc[0]!r} match none of the expected timestamp "
+                        f"formats ({_quoted(TIMESTAMP_FORMATS)}).")
+        return
+    try:
+        parse_timestamp_column(sample[column], column)
+    except ValueError as e:
+        problems.append(str(e))
+
+
+def _check_amounts(sample, column, problems):
+    values = sample[column].dropna()
+    bad = values[pd.to_numeric(values, errors='coerce').isna()]
+    if len(bad):
+        problems.append(f"{len(bad)} value(s) in the '{column}' column are not numbers: "
+                        + ', '.join(f'row {index}: {value!r}' for index, value in bad.head(MAX_REPORTED_PARSE_ERRORS).items()))
+
+
+def _raise_problems(filename, problems):
+    if problems:
+        raise ValueError(f"{os.path.basename(filename)} failed validation:\n- " + "\n- ".join(problems))
+
+
+def validate_orders_file(filename):
+    """Checks an Orders.csv export's header and first rows, raising one ValueError listing every problem."""
+    problems = []
+    with pipeline_stage('validate'):
+        sample = read_validation_sample(filename, ORDERS_DTYPES, problems)
+        if sample is not None:
+            _check_timestamps(sample, 'Opened', problems)
+            for column in ('Tip', 'Gratuity'):
+                _check_amounts(sample, column, problems)
+    _raise_problems(filename, problems)
+
+
+def validate_time_entries_file(filename, point_system=None):
+    """Checks a TimeEntries.csv export's header and first rows and returns a list of warnings.
+
+    Missing columns and unreadable timestamps raise one ValueError listing every problem. Job
+    titles the point system has no points for, and employees clocking in under several titles,
+    are returned as warnings, since the run can still go ahead.
+    """
+    problems = []
+    warnings = []
+    with pipeline_stage('validate'):
+        sample = read_validation_sample(filename, TIME_ENTRIES_DTYPES, problems)
+        if sample is not None:
+            for column in ('In Date', 'Out Date'):
+                _check_timestamps(sample, column, problems)
+            for column in ('Employee', 'Job Title'):
+                blank = sample.index[sample[column].isna()]
+                if len(blank):
+                    problems.append(f"{len(blank)} row(s) have no '{column}': rows {_quoted(blank.tolist())}.")
+    _raise_problems(filename, problems)
+
+    titles = sample[['Employee', 'Job Title']].drop_duplicates()
+    if point_system is not None:
+        unmapped = titles[~titles['Job Title'].isin(list(point_system))]
+        if len(unmapped):
+            roles = unmapped.groupby('Job Title', sort=True)['Employee'].nunique()
+            warnings.append("Job titles with no points in the selected point system, so their hours earn no tips: "
+                            + ', '.join(f"{role!r} ({count} employee(s))" for role, count in roles.items()) + ".")
+    multiple = titles.groupby('Employee', sort=True)['Job Title'].agg(list)
+    multiple = multiple[multiple.str.len() > 1]
+    if len(multiple):
+        warnings.append("Employees clocking in under more than one job title (each shift is paid at its own title): "
+                        + '; '.join(f"{employee} ({', '.join(roles)})" for employee, roles in multiple.items()) + ".")
+    if len(sample) == VALIDATION_SAMPLE_ROWS:
+        warnings = [f"{warning} Only the first {VALIDATION_SAMPLE_ROWS} rows were checked." for warning in warnings]
+    return warnings
+
+
 def read_csv_data(filename):
     try:
         df = pd.read_csv(filename)
@@ -60,96 +266,698 @@ def read_csv_data(filename):
 
 def write_excel_data(filename, data, sheet_name):
     try:
-        df = pd.DataFrame(data)
-        df.to_excel(filename, sheet_name=sheet_name, engine='openpyxl', index=False)
+        with pipeline_stage('write_excel') as stage:
+            df = pd.DataFrame(data)
+            stage['rows'] = len(df)
+            df.to_excel(filename, sheet_name=sheet_name, engine='openpyxl', index=False)
         return None  # Returning None to indicate no error
     except Exception as e:
         return str(e)  # Returning the error message
 
 
-def determine_pool(timestamp_str):
-    timestamp = try_parsing_date(timestamp_str)
-    if 6 <= timestamp.hour < 17:
-        return "Lunch"
-    else:
-        return "Dinner"
-
-
-def calculate_hours_in_pool(in_date_str, out_date_str):
-    in_date = try_parsing_date(in_date_str)
-    out_date = try_parsing_date(out_date_str)
-    if out_date < in_date:
-        out_date += timedelta(days=1)
-    lunch_start = in_date.replace(hour=6, minute=0)
-    lunch_end = in_date.replace(hour=16, minute=59)
-    dinner_start = in_date.replace(hour=17, minute=0)
-    dinner_end = in_date.replace(hour=5, minute=59) + timedelta(days=1)
-    lunch_hours = max(min(out_date, lunch_end) - max(in_date, lunch_start), timedelta(0)).total_seconds() / 3600
-    dinner_hours = max(min(out_date, dinner_end) - max(in_date, dinner_start), timedelta(0)).total_seconds() / 3600
-    return lunch_hours, dinner_hours
-
-
-def process_orders_for_week(df):
-    """Processes the Orders.csv file and returns aggregated tips for Lunch and Dinner for each day."""
+def _minute_of_day(text):
+    hour, minute = text.split(':')
+    minutes = int(hour) * 60 + int(minute)
+    if not 0 <= minutes < 24 * 60:
+        raise ValueError(f"'{text}' is not a time of day between 00:00 and 23:59.")
+    return minutes
+
+
+class PoolWindows(object):
+    """A day split into named tip pool windows (see POOL_WINDOWS), compiled for vectorized lookups.
+
+    Hours are attributed with a sweep over the window boundaries of each shift's clock-in day:
+    every shift is cut into the boundary segments it crosses, so the work grows with the shifts
+    and the boundaries they cross rather than with shifts x pools.
+
+    With carry_over, a window running past midnight keeps the hours and orders after midnight on
+    the day it started; without it only the clock-in day's windows count (the original rules).
+    """
+
+    def __init__(self, windows, carry_over=True):
+        self.windows = tuple((name, start, end) for name, start, end in windows)
+        self.carry_over = bool(carry_over)
+        self.names = np.array([name for name, _, _ in self.windows], dtype=object)
+        if not len(self.names):
+            raise ValueError("At least one pool window is needed.")
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Pool window names must be unique.")
+
+        # Each window anchored on the clock-in day, as minutes from that midnight; ends may pass 24:00
+        starts = np.array([_minute_of_day(start) for _, start, _ in self.windows])
+        ends = np.array([_minute_of_day(end) for _, _, end in self.windows])
+        ends = np.where(ends <= starts, ends + 24 * 60, ends)
+        by_start = np.argsort(starts, kind='stable')
+        wrapped_end = ends[by_start[-1]] - 24 * 60
+        if np.any(starts[by_start][1:] < ends[by_start][:-1]) or wrapped_end > starts[by_start[0]]:
+            raise ValueError("Pool windows must not overlap.")
+
+        # Segments between consecutive boundaries over the two days a shift can reach, each owned by
+        # the window covering it or by no pool (-1), and dated by the day that window started on
+        # relative to the clock-in day
+        anchors = (-1, 0, 1) if self.carry_over else (0,)
+        anchored = np.concatenate([[0, 2 * 24 * 60]] + [np.concatenate([starts, ends]) + day * 24 * 60
+                                                      for day in anchors])
+        self.boundaries = np.unique(np.clip(anchored, 0, 2 * 24 * 60))
+        self.segment_pool = np.full(len(self.boundaries) - 1, -1)
+        self.segment_day = np.zeros(len(self.boundaries) - 1, dtype='int64')
+        for day in anchors:
+            for pool, (start, end) in enumerate(zip(starts + day * 24 * 60, ends + day * 24 * 60)):
+                covered = (self.boundaries[:-1] >= start) & (self.boundaries[1:] <= end)
+                self.segment_pool[covered] = pool
+                self.segment_day[covered] = day
+
+        # Orders: window starts in time-of-day order; anything before the first wraps to the last
+        self.order_starts = starts[by_start]
+        self.order_pools = by_start
+
+        self.key = hashlib.sha1(repr((self.windows, self.carry_over)).encode()).hexdigest()[:12]
+
+    def __eq__(self, other):
+        return (isinstance(other, PoolWindows) and self.windows == other.windows
+                and self.carry_over == other.carry_over)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.windows, self.carry_over))
+
+    def pool_codes(self, timestamps):
+        """Index into names of each order's pool, for a datetime64 Series."""
+        return self.assign_orders(timestamps)[0]
+
+    def assign_orders(self, timestamps):
+        """(pool codes, pool dates) of each order, for a datetime64 Series.
+
+        Pool dates are the normalized days the orders' windows started on: the calendar day, or with
+        carry_over the day before for orders after midnight in a window that started the evening before.
+        """
+        minutes = (timestamps.dt.hour * 60 + timestamps.dt.minute).to_numpy()
+        slot = np.searchsorted(self.order_starts, minutes, side='right') - 1
+        dates = timestamps.dt.normalize()
+        if self.carry_over:
+            dates = dates - pd.to_timedelta((slot < 0).astype('int64'), unit='D')
+        return self.order_pools[slot], dates
+
+    def attribute_hours(self, in_dates, out_dates):
+        """Splits shifts into their hours per pool.
+
+        Takes datetime64 arrays of clock-in and clock-out times (a clock-out before the clock-in is
+        taken to be the next day) and returns (shift index, pool index, hours) arrays with one entry
+        per shift and pool it has hours in.
+        """
+        shift, pool, _, hours = self.attribute_hours_by_day(in_dates, out_dates)
+        return shift, pool, hours
+
+    def attribute_hours_by_day(self, in_dates, out_dates):
+        """attribute_hours, with an extra array of days (relative to the clock-in day) each piece's
+        window started on, before the hours. A shift worked across two nights' windows may have two
+        entries for the same pool.
+        """
+        in_dates = np.asarray(in_dates, dtype='datetime64[m]')
+        out_dates = np.asarray(out_dates, dtype='datetime64[m]')
+        out_dates = np.where(out_dates < in_dates, out_dates + np.timedelta64(1, 'D'), out_dates)
+
+        day = in_dates.astype('datetime64[D]').astype('datetime64[m]')
+        starts = (in_dates - day).astype('int64')
+        ends = np.minimum((out_dates - day).astype('int64'), self.boundaries[-1])
+
+        # Segments [first, last) crossed by each shift, expanded into one piece per segment
+        first = np.searchsorted(self.boundaries, starts, side='right') - 1
+        last = np.searchsorted(self.boundaries, ends, side='left')
+        counts = np.maximum(last - first, 0)
+        shift = np.repeat(np.arange(len(starts)), counts)
+        offsets = np.arange(len(shift)) - np.repeat(np.cumsum(counts) - counts, counts)
+        segment = first[shift] + offsets
+
+        minutes = (np.minimum(ends[shift], self.boundaries[segment + 1])
+                   - np.maximum(starts[shift], self.boundaries[segment]))
+        pool = self.segment_pool[segment]
+        keep = (pool >= 0) & (minutes > 0)
+        return shift[keep], pool[keep], self.segment_day[segment][keep], minutes[keep] / 60
+
+
+def named_pool_windows(name):
+    """The PoolWindows of one of POOL_WINDOWS, with the midnight rules that set uses."""
+    return PoolWindows(POOL_WINDOWS[name], carry_over=name not in CLOCK_IN_DAY_POOL_WINDOWS)
+
+
+def pool_windows_for(point_system_name=None):
+    """The PoolWindows a point system's stores use."""
+    return named_pool_windows(POINT_SYSTEM_POOL_WINDOWS.get(point_system_name, DEFAULT_POOL_WINDOWS))
+
+
+def determine_pool(timestamp_str, pool_windows=None):
+    timestamp = pd.Series([try_parsing_date(timestamp_str)])
+    return determine_pools(timestamp, pool_windows).iloc[0]
+
+
+def determine_pools(timestamps, pool_windows=None):
+    """Vectorized determine_pool for a datetime64 Series."""
+    pool_windows = pool_windows_for() if pool_windows is None else pool_windows
+    return pd.Series(pool_windows.names[pool_windows.pool_codes(timestamps)], index=timestamps.index)
+
+
+def calculate_hours_in_pool(in_date_str, out_date_str, pool_windows=None):
+    in_date = np.array([try_parsing_date(in_date_str)], dtype='datetime64[m]')
+    out_date = np.array([try_parsing_date(out_date_str)], dtype='datetime64[m]')
+    return tuple(float(hours[0]) for hours in calculate_hours_in_pool_batch(in_date, out_date, pool_windows))
+
+
+def calculate_hours_in_pool_batch(in_dates, out_dates, pool_windows=None):
+    """Vectorized calculate_hours_in_pool for datetime64 arrays of clock-in and clock-out times.
+
+    Returns one float array of hours per pool, in window order (lunch, dinner by default).
+    """
+    pool_windows = pool_windows_for() if pool_windows is None else pool_windows
+    shift, pool, hours = pool_windows.attribute_hours(in_dates, out_dates)
+    return tuple(np.bincount(shift[pool == code], weights=hours[pool == code], minlength=len(in_dates))
+                 for code in range(len(pool_windows.names)))
+
+
+def read_csv_chunks(filename, dtypes, chunksize=DEFAULT_CHUNKSIZE, progress=None, should_cancel=None,
+                    message="Reading file..."):
+    """Yields the file in chunks of `chunksize` rows, keeping only the columns in `dtypes`.
+
+    progress(percent, message) is reported from the share of the file read so far.
+    """
+    total_bytes = max(os.path.getsize(filename), 1)
+    with open(filename, 'rb') as f:
+        reader = pd.read_csv(f, usecols=list(dtypes), dtype=dtypes, chunksize=chunksize)
+        while True:
+            with pipeline_stage('read_csv') as stage:
+                chunk = next(reader, None)
+                stage['rows'] = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                break
+            check_cancelled(should_cancel)
+            yield chunk
+            report_progress(progress, min(100, f.tell() * 100 / total_bytes), message)
+
+
+def stream_orders_tip_totals(filename, chunksize=DEFAULT_CHUNKSIZE, progress=None, should_cancel=None,
+                             pool_windows=None):
+    """Streams an Orders.csv export and returns the same (date, pool) -> tips dict as process_orders_for_week."""
+    totals = None
+    for chunk in read_csv_chunks(filename, ORDERS_DTYPES, chunksize, progress, should_cancel,
+                                 "Aggregating tips per day and pool..."):
+        chunk_totals = aggregate_orders_chunk(chunk, pool_windows)
+        totals = chunk_totals if totals is None else totals.add(chunk_totals, fill_value=0)
+
+    if totals is None:
+        return {}
+    return {(day.date(), pool): tip for (day, pool), tip in totals.sort_index().items()}
+
+
+def stream_time_entries(filename, chunksize=DEFAULT_CHUNKSIZE, progress=None, should_cancel=None,
+                        pool_windows=None):
+    """Streams a TimeEntries.csv export into running per-(date, pool, employee, job title) hour totals.
+
+    Returns (roster_df, hours_table): roster_df holds each employee's first Employee/Job Title row in
+    file order, and hours_table has one Date/Pool/Employee/Job Title/Hours row per pool anyone worked
+    in under each title, so a Barback shift and a Server shift are paid at their own rates.
+    """
+    hours = None
+    roster_df = pd.DataFrame(columns=['Employee', 'Job Title'])
+    for chunk in read_csv_chunks(filename, TIME_ENTRIES_DTYPES, chunksize, progress, should_cancel,
+                                 "Calculating hours per day and pool..."):
+        chunk_hours = aggregate_time_entries_chunk(chunk, pool_windows)
+        hours = chunk_hours if hours is None else hours.add(chunk_hours, fill_value=0)
+        roster_df = update_roster(roster_df, chunk)
+
+    if hours is None:
+        return roster_df, pd.DataFrame(columns=['Date', 'Pool', 'Employee', 'Job Title', 'Hours'])
+    hours_table = hours.sort_index().reset_index()
+    hours_table['Date'] = hours_table['Date'].dt.date
+    return roster_df, hours_table
+
+
+def aggregate_orders_chunk(chunk, pool_windows=None):
+    """Tip + gratuity totals of a block of Orders.csv rows, as a Series indexed by (Date, Pool)."""
+    opened = parse_timestamp_column(chunk['Opened'], 'Opened')
+    with pipeline_stage('aggregate_orders') as stage:
+        stage['rows'] = len(chunk)
+        pool_windows = pool_windows_for() if pool_windows is None else pool_windows
+        pools, dates = pool_windows.assign_orders(opened)
+        tips = chunk['Tip'].fillna(0) + chunk['Gratuity'].fillna(0)
+        return tips.groupby([dates.rename('Date'),
+                             pd.Series(pool_windows.names[pools], index=opened.index, name='Pool')]).sum()
+
+
+def aggregate_time_entries_chunk(chunk, pool_windows=None):
+    """Hours of a block of TimeEntries.csv rows, as a Series indexed by (Date, Pool, Employee, Job Title)."""
+    pool_windows = pool_windows_for() if pool_windows is None else pool_windows
+    in_times = parse_timestamp_column(chunk['In Date'], 'In Date')
+    out_times = parse_timestamp_column(chunk['Out Date'], 'Out Date')
+    with pipeline_stage('aggregate_hours') as stage:
+        stage['rows'] = len(chunk)
+        shift, pool, day, shift_hours = pool_windows.attribute_hours_by_day(in_times.values, out_times.values)
+        pieces = pd.DataFrame({'Date': in_times.dt.normalize().to_numpy()[shift] + day.astype('timedelta64[D]'),
+                               'Pool': pool_windows.names[pool],
+                               'Employee': chunk['Employee'].iloc[shift].to_numpy(),
+                               'Job Title': chunk['Job Title'].iloc[shift].to_numpy(), 'Hours': shift_hours})
+        return pieces.groupby(['Date', 'Pool', 'Employee', 'Job Title'], observed=True)['Hours'].sum()
+
+
+def update_roster(roster_df, chunk):
+    """Adds the first Employee/Job Title row of each employee in chunk not already in roster_df."""
+    first_titles = chunk[['Employee', 'Job Title']].drop_duplicates('Employee').astype(object)
+    return pd.concat([roster_df, first_titles], ignore_index=True).drop_duplicates('Employee')
+
+
+def process_orders_for_week(df, pool_windows=None):
+    """Processes the Orders.csv file and returns aggregated tips for each day and pool."""
 
     # Check if 'Opened' column exists in the dataframe
     if 'Opened' not in df.columns:
         raise ValueError("The 'Opened' column is missing in the Orders.csv file. Please check the file.")
 
-    df['Date'] = df['Opened'].apply(lambda x: try_parsing_date(x).date())
-    df['Pool'] = df['Opened'].apply(determine_pool)
+    pool_windows = pool_windows_for() if pool_windows is None else pool_windows
+    opened = parse_timestamp_column(df['Opened'], 'Opened')
+    pools, dates = pool_windows.assign_orders(opened)
+    df['Date'] = dates.dt.date
+    df['Pool'] = pool_windows.names[pools]
 
-    grouped_tips = df.groupby(['Date', 'Pool']).apply(lambda group: group['Tip'].sum() + group['Gratuity'].sum())
+    with pipeline_stage('aggregate_orders') as stage:
+        stage['rows'] = len(df)
+        df['Tip Total'] = df['Tip'].fillna(0) + df['Gratuity'].fillna(0)
+        grouped_tips = df.groupby(['Date', 'Pool'])['Tip Total'].sum()
 
     return grouped_tips.to_dict()
 
 
 def process_time_entries_for_week(filename):
-    df = pd.read_csv(filename)
-    df['Date'] = df['In Date'].apply(lambda x: try_parsing_date(x).date())
-    df['Lunch Hours'], df['Dinner Hours'] = zip(
-        *df.apply(lambda row: calculate_hours_in_pool(row['In Date'], row['Out Date']), axis=1))
-
-    lunch_hours_per_day = df.groupby(['Date', 'Employee'])['Lunch Hours'].sum().to_dict()
-    dinner_hours_per_day = df.groupby(['Date', 'Employee'])['Dinner Hours'].sum().to_dict()
-
-    return lunch_hours_per_day, dinner_hours_per_day
+    """Returns the (date, employee) -> hours dicts for the default Lunch and Dinner pools."""
+    _, hours_table = stream_time_entries(filename)
+    hours = hours_table.pivot_table(index=['Date', 'Employee'], columns='Pool', values='Hours', aggfunc='sum',
+                                    fill_value=0.0)
+    keys = list(hours.index)
+    return tuple(dict(zip(keys, hours[pool])) if pool in hours else dict.fromkeys(keys, 0.0)
+                 for pool in ('Lunch', 'Dinner'))
+
+
+def build_employee_roles(time_entries_df):
+    """Maps each employee to the first job title they clock in with."""
+    first_entries = time_entries_df.drop_duplicates('Employee')
+    return dict(zip(first_entries['Employee'], first_entries['Job Title']))
+
+
+def build_hours_table(lunch_hours_per_employee, dinner_hours_per_employee):
+    """Flattens the per-pool (date, employee) -> hours dicts into one Date/Pool/Employee/Hours table."""
+    frames = []
+    for pool, hours_per_employee in (('Lunch', lunch_hours_per_employee), ('Dinner', dinner_hours_per_employee)):
+        frame = pd.DataFrame(list(hours_per_employee.keys()), columns=['Date', 'Employee'])
+        frame.insert(1, 'Pool', pool)
+        frame['Hours'] = list(hours_per_employee.values())
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+class HoursMatrix(object):
+    """Hours worked per (date, pool) x employee x role, stored sparsely alongside each pool's tip total.
+
+    Building it is the expensive part of an allocation; once built, any point system can be applied
+    with a handful of array operations, so switching or editing point systems is near-instant.
+    Hours are paid at the Job Title of the shift they were worked in when hours_table has that
+    column; tables without it (the legacy per-employee dicts) fall back to employee_roles.
+    """
+
+    def __init__(self, tip_pools, hours_table, employee_roles=None):
+        pools = pd.DataFrame(list(tip_pools.keys()), columns=['Date', 'Pool'])
+        pools['Pool Index'] = np.arange(len(pools))
+        self.pool_keys = list(tip_pools.keys())
+        self.tip_totals = np.array(list(tip_pools.values()), dtype=float)
+        self.pool_date, self.dates = pd.factorize(pools['Date'])
+        self.pool_name, self.pool_names = pd.factorize(pools['Pool'])
+
+        # Only employees who actually worked the day and shift share in its pool
+        shifts = pools.merge(hours_table[hours_table['Hours'] > 0], on=['Date', 'Pool'], how='inner')
+        if 'Job Title' in shifts.columns:
+            job_titles = shifts['Job Title'].astype(object).fillna('')
+        else:
+            job_titles = shifts['Employee'].map(employee_roles or {}).fillna('')
+
+        self.entry_pool = shifts['Pool Index'].to_numpy()
+        self.entry_employee, self.employees = pd.factorize(shifts['Employee'])
+        self.entry_role, self.roles = pd.factorize(job_titles)
+        self.entry_hours = shifts['Hours'].to_numpy(dtype=float)
+
+    def unmapped_roles(self, point_system):
+        """Roles someone worked hours in that the point system has no entry for."""
+        return [role for role in self.roles if role not in point_system]
+
+    def role_points(self, point_system):
+        """Points for each role code under the given point system; unknown roles earn nothing."""
+        return np.array([float(point_system.get(role, 0)) for role in self.roles])
+
+    def allocate(self, point_system, fee_rate=DEFAULT_FEE_RATE, exact_cents=False):
+        """Applies a point system and returns the resulting AllocationLedger.
+
+        With exact_cents the split is done in whole cents and every pool is paid out to the cent.
+        """
+        return AllocationLedger(self, point_system, fee_rate, exact_cents)
+
+    def employee_totals(self, point_system, fee_rate=DEFAULT_FEE_RATE, exact_cents=False):
+        """Returns employee -> total cut for the week, as a read-only mapping."""
+        return self.allocate(point_system, fee_rate, exact_cents).employee_cuts
+
+    def cuts_table(self, point_system, fee_rate=DEFAULT_FEE_RATE, exact_cents=False):
+        return self.allocate(point_system, fee_rate, exact_cents).cuts_table()
+
+    def pool_summary(self, point_system, fee_rate=DEFAULT_FEE_RATE, exact_cents=False):
+        return self.allocate(point_system, fee_rate, exact_cents).pool_summary()
+
+
+class LedgerTotals(Mapping):
+    """Read-only label -> total mapping over one ledger aggregation, for code written against dicts."""
+
+    def __init__(self, labels, totals):
+        self.labels = pd.Index(labels)
+        self.totals = totals
+
+    def __getitem__(self, key):
+        try:
+            position = self.labels.get_loc(key)
+        except (KeyError, TypeError):
+            raise KeyError(key)
+        return float(self.totals[position])
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def to_series(self, name=None):
+        return pd.Series(self.totals, index=self.labels, name=name)
+
+
+def largest_remainder_cents(entry_pool, weighted, pool_weighted, pool_cents):
+    """Splits each pool's whole cents across its entries in proportion to weighted, summing back exactly.
+
+    Every entry gets the floor of its exact share; each pool's leftover cents then go one apiece to
+    its entries with the largest fractional remainders (ties to the earlier entry). All pools are
+    handled in one pass with a single sort.
+    """
+    shares = np.divide(pool_cents[entry_pool] * weighted, pool_weighted[entry_pool],
+                       out=np.zeros_like(weighted), where=pool_weighted[entry_pool] != 0)
+    cents = np.floor(shares).astype(np.int64)
+    remainders = shares - cents
+    leftover = pool_cents - np.bincount(entry_pool, weights=cents, minlength=len(pool_cents)).astype(np.int64)
+
+    # Rank entries within their pool by remainder, largest first, and hand out the leftover cents.
+    # Remainders are in [0, 1), so pool - remainder orders by pool and then remainder in one float sort
+    order = np.argsort(entry_pool - remainders, kind='stable')
+    sorted_pools = entry_pool[order]
+    pool_starts = np.searchsorted(sorted_pools, np.arange(len(pool_cents)))
+    rank = np.arange(len(order)) - pool_starts[sorted_pools]
+    cents[order] += rank < leftover[sorted_pools]
+    return cents
+
+
+# Axes an AllocationLedger can be totalled along, and the column name each becomes in a table
+LEDGER_AXES = {'employee': 'Employee', 'role': 'Job Title', 'date': 'Date', 'pool': 'Pool'}
+
+
+class AllocationLedger(object):
+    """The result of applying a point system to a HoursMatrix, kept as flat arrays.
+
+    There is one entry per (date, pool, employee, role) with integer codes into the matrix's employees,
+    roles, dates and pool names, and float arrays of hours, points and cuts. Totals along any of
+    LEDGER_AXES are a single np.bincount, so nothing is expanded into per-entry Python objects until
+    a table is actually asked for.
+
+    With exact_cents the pools are split in whole cents (cut_cents, int64) by largest remainder, so
+    every pool's cuts add up to exactly its distributable amount.
+    """
+
+    def __init__(self, hours_matrix, point_system, fee_rate=DEFAULT_FEE_RATE, exact_cents=False):
+        self.hours_matrix = hours_matrix
+        self.fee_rate = fee_rate
+        self.exact_cents = exact_cents
+        self.points = hours_matrix.role_points(point_system)[hours_matrix.entry_role]
+        weighted = hours_matrix.entry_hours * self.points
+        self.weighted_hours = np.bincount(hours_matrix.entry_pool, weights=weighted,
+                                          minlength=len(hours_matrix.pool_keys))
+        if exact_cents:
+            pool_cents = np.floor(hours_matrix.tip_totals * 100 + 0.5).astype(np.int64)
+            self.distributable_cents = np.floor(pool_cents * (1 - fee_rate) + 0.5).astype(np.int64)
+            # Pools nobody earned points in keep their tips
+            self.distributable_cents[self.weighted_hours == 0] = 0
+            self.distributable = self.distributable_cents / 100
+        else:
+            self.distributable = np.where(self.weighted_hours == 0, 0.0, hours_matrix.tip_totals * (1 - fee_rate))
+        self.value_per_point = np.divide(self.distributable, self.weighted_hours,
+                                         out=np.zeros_like(self.distributable), where=self.weighted_hours != 0)
+        if exact_cents:
+            self.cut_cents = largest_remainder_cents(hours_matrix.entry_pool, weighted, self.weighted_hours,
+                                                     self.distributable_cents)
+            self.cuts = self.cut_cents / 100
+        else:
+            self.cuts = weighted * self.value_per_point[hours_matrix.entry_pool]
+
+    @property
+    def hours(self):
+        return self.hours_matrix.entry_hours
+
+    def codes(self, axis):
+        """(per-entry codes, labels) for one of LEDGER_AXES."""
+        matrix = self.hours_matrix
+        if axis == 'employee':
+            return matrix.entry_employee, matrix.employees
+        if axis == 'role':
+            return matrix.entry_role, matrix.roles
+        if axis == 'date':
+            return matrix.pool_date[matrix.entry_pool], matrix.dates
+        if axis == 'pool':
+            return matrix.pool_name[matrix.entry_pool], matrix.pool_names
+        raise ValueError(f"Unknown ledger axis '{axis}'. Choose one of: {', '.join(LEDGER_AXES)}")
+
+    def total(self, axis, values='cuts'):
+        """Sums 'cuts', 'hours', 'points' or (exact_cents only) 'cut_cents' per label of axis, as a Series."""
+        codes, labels = self.codes(axis)
+        return pd.Series(self._sum(codes, len(labels), values), index=pd.Index(labels, name=LEDGER_AXES[axis]),
+                         name=values)
+
+    @property
+    def employee_cuts(self):
+        """Employee -> weekly cut, for code that expects the old employee -> float dict."""
+        codes, labels = self.codes('employee')
+        return LedgerTotals(labels, self._sum(codes, len(labels), 'cuts'))
+
+    def _sum(self, codes, length, values):
+        # Whole cents sum exactly, so dollar totals are taken from them rather than from the float cuts
+        if values == 'cuts' and self.exact_cents:
+            return np.bincount(codes, weights=self.cut_cents, minlength=length).round() / 100
+        return np.bincount(codes, weights=getattr(self, values), minlength=length)
+
+    def cuts_table(self):
+        """One row per (Date, Pool, Employee, Job Title) with the hours, points, pool value per point and cut."""
+        matrix = self.hours_matrix
+        return pd.DataFrame({
+            'Date': matrix.dates[matrix.pool_date[matrix.entry_pool]],
+            'Pool': matrix.pool_names[matrix.pool_name[matrix.entry_pool]],
+            'Employee': matrix.employees[matrix.entry_employee],
+            'Job Title': matrix.roles[matrix.entry_role],
+            'Hours': matrix.entry_hours,
+            'Points': self.points,
+            'Tip Pool': matrix.tip_totals[matrix.entry_pool],
+            'Value Per Point': self.value_per_point[matrix.entry_pool],
+            'Cut': self.cuts,
+        })
+
+    def pool_summary(self):
+        """One row per (Date, Pool) with the tips, amount distributed, weighted hours and value per point."""
+        matrix = self.hours_matrix
+        return pd.DataFrame({
+            'Date': matrix.dates[matrix.pool_date],
+            'Pool': matrix.pool_names[matrix.pool_name],
+            'Tip Pool': matrix.tip_totals,
+            'Distributable': self.distributable,
+            'Weighted Hours': self.weighted_hours,
+            'Value Per Point': self.value_per_point,
+        })
+
+
+def compare_point_systems(hours_matrix, point_systems, fee_rate=DEFAULT_FEE_RATE):
+    """Evaluates many point systems over the same hours in one batched computation.
+
+    point_systems maps scenario name -> point system (see POINT_SYSTEMS and sweep_point_system).
+    Returns a DataFrame of weekly cuts with one row per employee and one column per scenario.
+    """
+    names = list(point_systems)
+    # Scenario x role points, then each pool's total weighted hours for every scenario at once
+    points = np.array([hours_matrix.role_points(point_systems[name]) for name in names]).reshape(
+        len(names), len(hours_matrix.roles))
+    pool_role_hours = np.zeros((len(hours_matrix.pool_keys), len(hours_matrix.roles)))
+    np.add.at(pool_role_hours, (hours_matrix.entry_pool, hours_matrix.entry_role), hours_matrix.entry_hours)
+    total_weighted = pool_role_hours @ points.T
+    distributable = (hours_matrix.tip_totals * (1 - fee_rate))[:, None]
+    value_per_point = np.divide(distributable, total_weighted, out=np.zeros_like(total_weighted),
+                                where=total_weighted != 0)
+
+    # Sum each employee's entries with reduceat over entries sorted by employee
+    order = np.argsort(hours_matrix.entry_employee, kind='stable')
+    entry_employee = hours_matrix.entry_employee[order]
+    entry_pool = hours_matrix.entry_pool[order]
+    entry_role = hours_matrix.entry_role[order]
+    entry_hours = hours_matrix.entry_hours[order]
+    employee_codes, starts = np.unique(entry_employee, return_index=True)
+
+    totals = np.zeros((len(hours_matrix.employees), len(names)))
+    if len(entry_hours):
+        block = max(1, SCENARIO_BLOCK_VALUES // len(entry_hours))
+        for first in range(0, len(names), block):
+            columns = slice(first, first + block)
+            cuts = entry_hours[:, None] * points[columns].T[entry_role] * value_per_point[entry_pool, columns]
+            totals[employee_codes, columns] = np.add.reduceat(cuts, starts, axis=0)
+
+    return pd.DataFrame(totals, index=pd.Index(hours_matrix.employees, name='Employee'), columns=names)
+
+
+def write_scenario_comparison(filename, comparison, sheet_name='Scenarios'):
+    """Writes a compare_point_systems table to Excel; returns an error message or None like write_excel_data."""
+    return write_excel_data(filename, comparison.reset_index(), sheet_name)
+
+
+def allocate_tips_for_week(tip_pools, hours_table, employee_roles, point_system):
+    """Splits every (date, pool) tip pool across the employees who worked it, for the whole week at once.
+
+    Returns one row per (Date, Pool, Employee) with the hours, points, pool value per point and cut.
+    """
+    return HoursMatrix(tip_pools, hours_table, employee_roles).cuts_table(point_system)
 
 
 def distribute_tips_for_day(date, pool, tip_pool, hours_per_employee, point_system, time_entries_df):
-    total_tip_pool = tip_pool * 0.965
-
-    # Filtering only employees who worked on that day and shift
-    working_employees = [employee for (day, employee), hours in hours_per_employee.items() if day == date and hours > 0]
-
-    # Calculating the total weighted contribution for the filtered employees
-    total_weighted_contribution = sum(
-        [hours_per_employee.get((date, employee), 0) * role_pool_points.get(
-            time_entries_df.loc[time_entries_df['Employee'] == employee, 'Job Title'].values[0], 0)
-         for employee in working_employees])
-
-    # Calculating value per point
-    value_per_point = total_tip_pool / total_weighted_contribution if total_weighted_contribution != 0 else 0
-
-    # Calculating each employee's cut for the day and shift
-    daily_cuts = {}
-    for employee in working_employees:
-        job_title = time_entries_df.loc[time_entries_df['Employee'] == employee, 'Job Title'].values[0]
-        daily_cuts[employee] = hours_per_employee.get((date, employee), 0) * point_system.get(job_title,
-                                                                                              0) * value_per_point
-    return daily_cuts
+    hours_table = pd.DataFrame(
+        [(day, pool, employee, hours) for (day, employee), hours in hours_per_employee.items() if day == date],
+        columns=['Date', 'Pool', 'Employee', 'Hours'])
+    cuts = allocate_tips_for_week({(date, pool): tip_pool}, hours_table, build_employee_roles(time_entries_df),
+                                  point_system)
+    return dict(zip(cuts['Employee'], cuts['Cut']))
 
 
 def distribute_tips_among_employees_for_week(tip_pools, lunch_hours_per_employee, dinner_hours_per_employee, point_system, time_entries_df):
-    employee_weekly_cuts = {}
-
-    for (date, pool), tip_pool in tip_pools.items():
-        daily_cuts = distribute_tips_for_day(date, pool, tip_pool,
-                                             lunch_hours_per_employee if pool == 'Lunch' else dinner_hours_per_employee,
-                                             point_system, time_entries_df)
-        for employee, cut in daily_cuts.items():
-            employee_weekly_cuts[employee] = employee_weekly_cuts.get(employee, 0) + cut
+    """Allocates the week and returns its AllocationLedger; ledger.employee_cuts is the old employee -> tip dict."""
+    hours_table = build_hours_table(lunch_hours_per_employee, dinner_hours_per_employee)
+    hours_matrix = HoursMatrix(tip_pools, hours_table, build_employee_roles(time_entries_df))
+    return hours_matrix.allocate(point_system)
+
+
+class WeeklyRun(object):
+    """Everything one Distribute Tips run produces, kept together for the GUI and exports."""
+
+    def __init__(self, tip_pools, roster_df, hours_table, hours_matrix, point_system, fee_rate=DEFAULT_FEE_RATE,
+                 exact_cents=False, pool_windows=None, point_system_name=None):
+        self.tip_pools = tip_pools
+        self.roster_df = roster_df
+        self.hours_table = hours_table
+        self.hours_matrix = hours_matrix
+        self.pool_windows = pool_windows_for() if pool_windows is None else pool_windows
+        self.fee_rate = fee_rate
+        self.exact_cents = exact_cents
+        self.reweight(point_system, point_system_name)
+
+        # First and last day anyone clocked in, used to name saved results
+        self.start_date = min(hours_table['Date']) if len(hours_table) else None
+        self.end_date = max(hours_table['Date']) if len(hours_table) else None
+
+    def reweight(self, point_system, point_system_name=None):
+        """Re-applies a (possibly edited) point system to the hours already loaded, without re-reading anything.
+
+        point_system_name is the name the allocation is recorded under in the history.
+        """
+        self.point_system = dict(point_system)
+        self.point_system_name = point_system_name
+        self.ledger = self.hours_matrix.allocate(self.point_system, self.fee_rate, self.exact_cents)
+        self.employee_weekly_cuts = self.ledger.employee_cuts
+        self._cuts = None
+
+    def snapshot(self):
+        """A copy frozen at the current allocation, for background work while this run is reweighted.
+
+        reweight() and exact_cents only rebind attributes on this object, so a shallow copy with its
+        cuts table already built keeps the ledger, cuts, fee rate and exact_cents of this moment.
+        """
+        frozen = copy.copy(self)
+        frozen.point_system = dict(self.point_system)
+        frozen._cuts = self.cuts
+        return frozen
+
+    @property
+    def cuts(self):
+        """Per (Date, Pool, Employee, Job Title) cuts under the current point system, built on first use."""
+        if self._cuts is None:
+            self._cuts = self.ledger.cuts_table()
+        return self._cuts
+
+
+def load_orders(filename, progress=None, should_cancel=None, chunksize=DEFAULT_CHUNKSIZE, pool_windows=None):
+    """Streams an Orders.csv export and returns the (date, pool) -> tip totals."""
+    report_progress(progress, 0, "Checking orders file...")
+    validate_orders_file(filename)
+    report_progress(progress, 0, "Reading orders file...")
+    tip_pools = stream_orders_tip_totals(filename, chunksize, progress, should_cancel, pool_windows)
+    report_progress(progress, 100, "Orders file processed.")
+    return tip_pools
+
+
+def check_time_entries_file(filename, point_system=None, warn=None):
+    """validate_time_entries_file, handing any warnings to warn(warnings) instead of returning them."""
+    warnings = validate_time_entries_file(filename, point_system)
+    if warnings and warn is not None:
+        warn(warnings)
+
+
+def load_time_entries(filename, progress=None, should_cancel=None, chunksize=DEFAULT_CHUNKSIZE, pool_windows=None,
+                      point_system=None, warn=None):
+    """Streams a TimeEntries.csv export and returns (roster_df, hours_table).
+
+    The file is validated first (see check_time_entries_file); warnings go to warn(warnings).
+    """
+    report_progress(progress, 0, "Checking time entries file...")
+    check_time_entries_file(filename, point_system, warn)
+    report_progress(progress, 0, "Reading time entries file...")
+    time_entries = stream_time_entries(filename, chunksize, progress, should_cancel, pool_windows)
+    report_progress(progress, 100, "Time entries file processed.")
+    return time_entries
+
+
+def run_weekly_pipeline(orders_filename, time_entries_filename, point_system, progress=None, should_cancel=None,
+                        tip_pools=None, time_entries=None, orders_loader=load_orders,
+                        time_entries_loader=load_time_entries, fee_rate=DEFAULT_FEE_RATE, exact_cents=False,
+                        pool_windows=None, warn=None, point_system_name=None):
+    """Runs read -> orders aggregation -> hours aggregation -> allocation and returns a WeeklyRun.
+
+    progress(percent, message) is called as each stage starts, and should_cancel() is polled between
+    stages. Results already produced by load_orders / load_time_entries can be passed in to skip those
+    stages, and the loaders themselves can be swapped (e.g. for the cached ones in parse_cache).
+    fee_rate and exact_cents are passed on to HoursMatrix.allocate; pool_windows (default: the
+    DEFAULT_POOL_WINDOWS) decides which tip pools orders and hours fall into. Warnings about the time
+    entries file (see validate_time_entries_file) are passed to warn(warnings), and point_system_name is
+    kept on the WeeklyRun to record the run under.
+    """
+    pool_windows = pool_windows_for() if pool_windows is None else pool_windows
+    if tip_pools is None:
+        tip_pools = orders_loader(orders_filename, scaled_progress(progress, 0, 40), should_cancel,
+                                  pool_windows=pool_windows)
+    check_cancelled(should_cancel)
+
+    if time_entries is None:
+        time_entries = time_entries_loader(time_entries_filename, scaled_progress(progress, 40, 80), should_cancel,
+                                           pool_windows=pool_windows, point_system=point_system, warn=warn)
+    roster_df, hours_table = time_entries
+    check_cancelled(should_cancel)
+
+    report_progress(progress, 80, "Distributing tips...")
+    with pipeline_stage('allocate') as stage:
+        stage['rows'] = len(hours_table)
+        hours_matrix = HoursMatrix(tip_pools, hours_table)
+        weekly_run = WeeklyRun(tip_pools, roster_df, hours_table, hours_matrix, point_system, fee_rate, exact_cents,
+                               pool_windows, point_system_name)
+    report_progress(progress, 100, "Tips distributed successfully!")
+    return weekly_run
 
-    return employee_weekly_cuts
 
 # The main function is not needed since the logic will now be driven by GUI interactions.
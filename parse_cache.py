@@ -0,0 +1,161 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from mainWeekly import (
+    PARSER_VERSION,
+    check_time_entries_file,
+    load_orders,
+    load_time_entries,
+    pool_windows_for,
+    report_progress,
+)
+
+# Parsed exports are cached here, one directory per (file content, parser version, pool windows)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".mygrat", "cache")
+
+# Least recently used entries are evicted once the cache grows past this size
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# Feather is much faster to load than CSV but needs pyarrow; fall back to pickle without it
+try:
+    import pyarrow  # noqa: F401
+    TABLE_EXTENSION = '.feather'
+except ImportError:
+    TABLE_EXTENSION = '.pkl'
+
+
+def file_content_hash(filename, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _entry_dir(kind, content_hash, pool_windows, cache_dir):
+    pool_windows = pool_windows_for() if pool_windows is None else pool_windows
+    return os.path.join(cache_dir, f"{kind}-v{PARSER_VERSION}-{pool_windows.key}-{content_hash}")
+
+
+def write_table(df, path):
+    """Saves a DataFrame as TABLE_EXTENSION (feather, or pickle without pyarrow); the index is dropped."""
+    if TABLE_EXTENSION == '.feather':
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_pickle(path)
+
+
+def read_table(path):
+    """Loads a table saved by write_table."""
+    if TABLE_EXTENSION == '.feather':
+        return pd.read_feather(path)
+    return pd.read_pickle(path)
+
+
+def _load_entry(entry_dir, names):
+    paths = [os.path.join(entry_dir, name + TABLE_EXTENSION) for name in names]
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    try:
+        tables = [read_table(path) for path in paths]
+        os.utime(entry_dir)  # mark as recently used for LRU eviction
+    except OSError:
+        return None  # replaced or evicted by another writer while reading; parse again
+    return tables
+
+
+def _store_entry(entry_dir, tables, cache_dir, max_bytes):
+    # Write into a temporary directory first so a half-written entry is never picked up. Each write
+    # gets its own, since an upload worker and a Distribute run may store the same file at once
+    temp_dir = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix=os.path.basename(entry_dir) + '-', suffix='.tmp', dir=cache_dir)
+        for name, df in tables.items():
+            write_table(df, os.path.join(temp_dir, name + TABLE_EXTENSION))
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(temp_dir, entry_dir)
+        evict(cache_dir, max_bytes)
+    except OSError:
+        # The cache only saves time; a read-only or full disk, or losing the race to publish the
+        # same entry, must not fail the run
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _entry_size(entry_dir):
+    return sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Deletes least recently used entries until the cache fits in max_bytes."""
+    if not os.path.isdir(cache_dir):
+        return
+    entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+               if os.path.isdir(os.path.join(cache_dir, name)) and not name.endswith('.tmp')]
+    entries.sort(key=os.path.getmtime)
+    total_bytes = sum(_entry_size(entry) for entry in entries)
+    for entry in entries:
+        if total_bytes <= max_bytes:
+            break
+        total_bytes -= _entry_size(entry)
+        shutil.rmtree(entry, ignore_errors=True)
+
+
+def invalidate(filename=None, cache_dir=CACHE_DIR):
+    """Removes the cached entries for one export, or the whole cache when no filename is given."""
+    if not os.path.isdir(cache_dir):
+        return
+    if filename is None:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        return
+    content_hash = file_content_hash(filename)
+    for name in os.listdir(cache_dir):
+        if name.endswith(content_hash):
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+
+def cached_load_orders(filename, progress=None, should_cancel=None, pool_windows=None, cache_dir=CACHE_DIR,
+                       max_bytes=MAX_CACHE_BYTES):
+    """load_orders, skipped entirely when the same file content has been parsed before."""
+    entry_dir = _entry_dir('orders', file_content_hash(filename), pool_windows, cache_dir)
+    tables = _load_entry(entry_dir, ['tip_pools'])
+    if tables is not None:
+        tip_pools_df = tables[0]
+        report_progress(progress, 100, "Orders file loaded from cache.")
+        return {(day.date(), pool): tip for day, pool, tip in
+                zip(tip_pools_df['Date'], tip_pools_df['Pool'], tip_pools_df['Tip'])}
+
+    tip_pools = load_orders(filename, progress, should_cancel, pool_windows=pool_windows)
+    tip_pools_df = pd.DataFrame([(pd.Timestamp(day), pool, tip) for (day, pool), tip in tip_pools.items()],
+                                columns=['Date', 'Pool', 'Tip'])
+    _store_entry(entry_dir, {'tip_pools': tip_pools_df}, cache_dir, max_bytes)
+    return tip_pools
+
+
+def cached_load_time_entries(filename, progress=None, should_cancel=None, pool_windows=None, point_system=None,
+                             warn=None, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """load_time_entries, skipped entirely when the same file content has been parsed before.
+
+    A cached file already passed validation, so it is only checked again when someone wants its warnings.
+    """
+    entry_dir = _entry_dir('time_entries', file_content_hash(filename), pool_windows, cache_dir)
+    tables = _load_entry(entry_dir, ['roster', 'hours'])
+    if tables is not None:
+        roster_df, hours_table = tables
+        if warn is not None:
+            check_time_entries_file(filename, point_system, warn)
+        report_progress(progress, 100, "Time entries file loaded from cache.")
+        hours_table['Date'] = hours_table['Date'].dt.date
+        return roster_df, hours_table
+
+    roster_df, hours_table = load_time_entries(filename, progress, should_cancel, pool_windows=pool_windows,
+                                               point_system=point_system, warn=warn)
+    # Feather has no plain date type; store the day as a timestamp
+    stored_hours = hours_table.assign(Date=pd.to_datetime(hours_table['Date']))
+    _store_entry(entry_dir, {'roster': roster_df.astype(str), 'hours': stored_hours}, cache_dir, max_bytes)
+    return roster_df, hours_table
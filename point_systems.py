@@ -0,0 +1,67 @@
+"""Point systems, tip pool windows and fees: plain settings with no heavy imports.
+
+Kept apart from mainWeekly so the GUI can fill its dropdowns and points table before pandas
+and NumPy have loaded; mainWeekly re-exports everything here.
+"""
+
+# New: Define the different point systems
+POINT_SYSTEMS = {
+    "Mocha Red": {
+        'Head Bartender': 1.25,
+        'Bartender': 1,
+        'Captain': 1,
+        'Expeditor': 1,
+        'Server': 1,
+        'Head Barback': 0.7,
+        'Runner': 0.7,
+        'Barback': 0.5,
+        'Busser': 0.5,
+        'Maitre\'D': 0.2,
+        'General Manager': 0,
+        'Manager': 0,
+        'Training': 0
+    },
+    "Mocha Lux": {
+        'Captain': 8,
+        'Lead Bartender': 8,
+        'Bartender': 6,
+        'Server': 6,
+        'Expeditor': 5,
+        'Runner': 4,
+        'Barback': 3.5,
+        'Busser': 3.5,
+        'Polisher': 2,
+        'Beverage Manager': 0,
+        'General Manager': 0,
+        'GeneralManager': 0,
+        'Host': 0,
+        'OLO_GS': 0,
+        'Shift Manager / Assistant Manager': 0,
+        'Training': 0
+    }
+}
+
+# Reference the default system for backward compatibility
+role_pool_points = POINT_SYSTEMS["Mocha Red"]
+
+# Share of every tip pool kept back before it is split (card processing fees); 0.035 distributes 96.5%
+DEFAULT_FEE_RATE = 0.035
+
+# Tip pool windows as (pool, start, end) times of day. Hours worked between start and end count
+# towards the pool; an end at or before the start runs past midnight. Orders go to the pool whose
+# start is the latest at or before their time of day, so gaps between windows fall to the pool before.
+POOL_WINDOWS = {
+    "Lunch/Dinner": (('Lunch', '06:00', '16:59'), ('Dinner', '17:00', '05:59')),
+    "Brunch/Happy Hour/Dinner/Late Night": (('Brunch', '09:00', '15:00'), ('Happy Hour', '15:00', '18:00'),
+                                            ('Dinner', '18:00', '23:00'), ('Late Night', '23:00', '03:00')),
+}
+DEFAULT_POOL_WINDOWS = "Lunch/Dinner"
+
+# Window sets that keep the original midnight rules: hours only count towards the windows of the
+# clock-in day and orders are dated by calendar day. Every other set carries a window that runs past
+# midnight back to the day it started, so a shift clocking in at 00:30 and an order at 00:45 land in
+# the previous evening's pool.
+CLOCK_IN_DAY_POOL_WINDOWS = {"Lunch/Dinner"}
+
+# Point systems whose stores split the day differently; every other system uses DEFAULT_POOL_WINDOWS
+POINT_SYSTEM_POOL_WINDOWS = {}
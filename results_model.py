@@ -0,0 +1,109 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+
+class DataFrameTableModel(QAbstractTableModel):
+    """Read-only table model over a DataFrame for QTableView.
+
+    Cells are formatted only when the view asks for them, so cost follows the visible rows rather
+    than the table size. Filtering and sorting work on an array of row positions; the DataFrame
+    itself is never copied.
+    """
+
+    def __init__(self, frame=None, parent=None):
+        super(DataFrameTableModel, self).__init__(parent)
+        self._columns = []
+        self._values = []
+        self._frame = pd.DataFrame()
+        self._rows = np.arange(0)
+        self._sort_column = None
+        self._sort_order = Qt.AscendingOrder
+        if frame is not None:
+            self.set_frame(frame)
+
+    def set_frame(self, frame):
+        self.beginResetModel()
+        self._frame = frame.reset_index(drop=True)
+        self._columns = list(self._frame.columns)
+        self._values = [self._frame[column].to_numpy() for column in self._columns]
+        self._rows = np.arange(len(self._frame))
+        self._sort_column = None
+        self.endResetModel()
+
+    def frame(self):
+        return self._frame
+
+    def row_record(self, row):
+        """The underlying values of a view row, as a column -> value dict."""
+        position = self._rows[row]
+        return {column: values[position] for column, values in zip(self._columns, self._values)}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._columns[section]
+        return str(section + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self._values[index.column()][self._rows[index.row()]]
+        if role == Qt.DisplayRole:
+            return format_cell(value)
+        if role == Qt.TextAlignmentRole and isinstance(value, (float, np.floating, int, np.integer)):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self._sort_column = column
+        self._sort_order = order
+        self._rows = self._sorted(self._rows)
+        self.layoutChanged.emit()
+
+    def _sorted(self, rows):
+        if self._sort_column is None or not len(rows):
+            return rows
+        keys = pd.Series(self._values[self._sort_column][rows])
+        ascending = self._sort_order == Qt.AscendingOrder
+        order = keys.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+        return rows[order]
+
+    def set_filter(self, column_name, text):
+        """Keeps only rows whose displayed value in column_name contains text (case-insensitive)."""
+        self.beginResetModel()
+        if not text or column_name not in self._columns:
+            rows = np.arange(len(self._frame))
+        else:
+            rows = np.flatnonzero(matching_rows(self._frame[column_name], text))
+        self._rows = self._sorted(rows)
+        self.endResetModel()
+
+
+def matching_rows(column, text):
+    """Boolean array of the values in a Series whose displayed text contains text (case-insensitive)."""
+    if len(column) and isinstance(column.iloc[0], date):
+        shown = pd.to_datetime(column).dt.strftime('%m/%d/%Y')
+    else:
+        shown = column.astype(str)
+    return shown.str.contains(text, case=False, regex=False).to_numpy()
+
+
+def format_cell(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    if isinstance(value, (float, np.floating)):
+        return f"{value:,.2f}"
+    if isinstance(value, date):
+        return value.strftime('%m/%d/%Y')
+    return str(value)
@@ -0,0 +1,157 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mainWeekly import (
+    POINT_SYSTEMS,
+    HoursMatrix,
+    calculate_hours_in_pool,
+    calculate_hours_in_pool_batch,
+    named_pool_windows,
+    pool_windows_for,
+    run_weekly_pipeline,
+    try_parsing_date,
+)
+
+
+def reference_hours_in_pool(in_date_str, out_date_str):
+    """The original per-shift Lunch/Dinner split, kept verbatim as the reference for the vectorized one."""
+    in_date = try_parsing_date(in_date_str)
+    out_date = try_parsing_date(out_date_str)
+    if out_date < in_date:
+        out_date += timedelta(days=1)
+    lunch_start = in_date.replace(hour=6, minute=0)
+    lunch_end = in_date.replace(hour=16, minute=59)
+    dinner_start = in_date.replace(hour=17, minute=0)
+    dinner_end = in_date.replace(hour=5, minute=59) + timedelta(days=1)
+    lunch_hours = max(min(out_date, lunch_end) - max(in_date, lunch_start), timedelta(0)).total_seconds() / 3600
+    dinner_hours = max(min(out_date, dinner_end) - max(in_date, dinner_start), timedelta(0)).total_seconds() / 3600
+    return lunch_hours, dinner_hours
+
+
+def _stamp(moment):
+    return moment.strftime('%m/%d/%Y %H:%M')
+
+
+EDGE_SHIFTS = [
+    ('01/02/2024 05:59', '01/02/2024 06:00'),
+    ('01/02/2024 06:00', '01/02/2024 16:59'),
+    ('01/02/2024 16:59', '01/02/2024 17:00'),
+    ('01/02/2024 17:00', '01/03/2024 05:59'),
+    ('01/02/2024 16:00', '01/02/2024 18:00'),
+    ('01/02/2024 10:00', '01/02/2024 10:00'),
+    ('01/02/2024 22:00', '01/03/2024 02:00'),
+    ('01/02/2024 22:00', '01/02/2024 02:00'),  # clock-out before clock-in rolls over to the next day
+    ('01/02/2024 23:30', '01/02/2024 05:59'),
+    ('01/02/2024 23:30', '01/02/2024 06:30'),
+    ('01/02/2024 20:00', '01/03/2024 10:00'),
+    ('01/02/2024 02:00', '01/02/2024 05:00'),
+    ('01/02/2024 04:00', '01/02/2024 07:00'),
+    ('12/31/2024 21:00', '01/01/2025 01:00'),
+    ('01/02/24 04:59 PM', '01/02/24 11:15 PM'),
+]
+
+
+def _random_shifts(count, seed=2024):
+    rng = np.random.default_rng(seed)
+    first_day = datetime(2024, 1, 1)
+    shifts = []
+    for _ in range(count):
+        clock_in = first_day + timedelta(days=int(rng.integers(0, 28)), minutes=int(rng.integers(0, 24 * 60)))
+        clock_out = clock_in + timedelta(minutes=int(rng.integers(0, 14 * 60)))
+        if rng.random() < 0.1:
+            clock_out -= timedelta(days=1)  # exported without the date rolling over
+        shifts.append((_stamp(clock_in), _stamp(clock_out)))
+    return shifts
+
+
+@pytest.mark.parametrize('shifts', [EDGE_SHIFTS, _random_shifts(2000)], ids=['edges', 'random'])
+def test_batch_hours_match_scalar_reference(shifts):
+    in_dates = np.array([try_parsing_date(clock_in) for clock_in, _ in shifts], dtype='datetime64[m]')
+    out_dates = np.array([try_parsing_date(clock_out) for _, clock_out in shifts], dtype='datetime64[m]')
+    lunch, dinner = calculate_hours_in_pool_batch(in_dates, out_dates)
+
+    expected = np.array([reference_hours_in_pool(clock_in, clock_out) for clock_in, clock_out in shifts])
+    np.testing.assert_allclose(lunch, expected[:, 0], atol=1e-9)
+    np.testing.assert_allclose(dinner, expected[:, 1], atol=1e-9)
+
+
+@pytest.mark.parametrize('clock_in, clock_out', EDGE_SHIFTS)
+def test_scalar_hours_match_scalar_reference(clock_in, clock_out):
+    assert calculate_hours_in_pool(clock_in, clock_out) == pytest.approx(reference_hours_in_pool(clock_in, clock_out))
+
+
+LATE_NIGHT_ORDERS = 'Opened,Tip,Gratuity\n01/05/2024 23:30,40,0\n01/06/2024 00:45,100,0\n'
+LATE_NIGHT_SHIFTS = ('Employee,Job Title,In Date,Out Date\n'
+                     'Jane,Server,01/05/2024 22:00,01/06/2024 02:00\n'
+                     'Bob,Server,01/06/2024 00:30,01/06/2024 02:30\n')
+
+
+def _run_late_night(tmp_path, pool_windows):
+    orders = tmp_path / 'Orders.csv'
+    orders.write_text(LATE_NIGHT_ORDERS)
+    time_entries = tmp_path / 'TimeEntries.csv'
+    time_entries.write_text(LATE_NIGHT_SHIFTS)
+    return run_weekly_pipeline(str(orders), str(time_entries), POINT_SYSTEMS['Mocha Red'], fee_rate=0,
+                               pool_windows=pool_windows)
+
+
+def test_late_night_window_carries_over_midnight(tmp_path):
+    weekly_run = _run_late_night(tmp_path, named_pool_windows('Brunch/Happy Hour/Dinner/Late Night'))
+
+    assert weekly_run.tip_pools == {(date(2024, 1, 5), 'Late Night'): 140}
+    hours = weekly_run.hours_table.set_index(['Date', 'Pool', 'Employee'])['Hours']
+    assert hours[(date(2024, 1, 5), 'Late Night', 'Jane')] == pytest.approx(3)
+    assert hours[(date(2024, 1, 5), 'Late Night', 'Bob')] == pytest.approx(2)
+    assert weekly_run.employee_weekly_cuts['Jane'] == pytest.approx(84)
+    assert weekly_run.employee_weekly_cuts['Bob'] == pytest.approx(56)
+
+
+def test_lunch_dinner_keeps_calendar_days_after_midnight(tmp_path):
+    weekly_run = _run_late_night(tmp_path, pool_windows_for())
+
+    assert weekly_run.tip_pools == {(date(2024, 1, 5), 'Dinner'): 40, (date(2024, 1, 6), 'Dinner'): 100}
+    assert set(weekly_run.hours_table['Employee']) == {'Jane'}
+
+
+def test_overnight_shift_reaches_the_next_days_windows():
+    pool_windows = named_pool_windows('Brunch/Happy Hour/Dinner/Late Night')
+    in_dates = np.array(['2024-01-05T20:00', '2024-01-06T02:00'], dtype='datetime64[m]')
+    out_dates = np.array(['2024-01-06T10:00', '2024-01-06T04:00'], dtype='datetime64[m]')
+    shift, pool, day, hours = pool_windows.attribute_hours_by_day(in_dates, out_dates)
+
+    pieces = sorted(zip(shift.tolist(), pool_windows.names[pool].tolist(), day.tolist(), hours.tolist()))
+    assert pieces == [(0, 'Brunch', 1, 1.0), (0, 'Dinner', 0, 3.0), (0, 'Late Night', 0, 4.0),
+                      (1, 'Late Night', -1, 1.0)]
+
+
+def test_pools_without_points_distribute_nothing(tmp_path):
+    weekly_run = _run_late_night(tmp_path, pool_windows_for())
+
+    summary = weekly_run.ledger.pool_summary().set_index(['Date', 'Pool'])
+    assert summary.loc[(date(2024, 1, 6), 'Dinner'), 'Distributable'] == 0
+    assert summary.loc[(date(2024, 1, 5), 'Dinner'), 'Distributable'] == pytest.approx(40)
+
+
+def test_exact_cents_add_up_to_each_pool():
+    hours_table = pd.DataFrame({
+        'Date': [date(2024, 1, 1)] * 7 + [date(2024, 1, 2)] * 3 + [date(2024, 1, 3)],
+        'Pool': ['Lunch'] * 7 + ['Dinner'] * 3 + ['Lunch'],
+        'Employee': [f"E{number}" for number in range(7)] + ['E0', 'E1', 'E2', 'E3'],
+        'Job Title': ['Server', 'Server', 'Busser', 'Bartender', 'Runner', 'Host', 'Server',
+                      'Server', 'Busser', 'Runner', 'Host'],
+        'Hours': [3.25, 1.5, 4, 0.75, 2, 6, 0.1, 5, 5, 5, 8],
+    })
+    tip_pools = {(date(2024, 1, 1), 'Lunch'): 0.03, (date(2024, 1, 2), 'Dinner'): 1234.57,
+                 (date(2024, 1, 3), 'Lunch'): 55.55, (date(2024, 1, 4), 'Dinner'): 80.0}
+    point_system = dict(POINT_SYSTEMS['Mocha Red'], Host=0)
+    ledger = HoursMatrix(tip_pools, hours_table).allocate(point_system, exact_cents=True)
+
+    matrix = ledger.hours_matrix
+    per_pool = np.bincount(matrix.entry_pool, weights=ledger.cut_cents, minlength=len(matrix.pool_keys))
+    np.testing.assert_array_equal(per_pool, ledger.distributable_cents)
+    assert (ledger.cut_cents >= 0).all()
+    # The Host-only pool and the pool nobody worked keep their tips
+    assert sorted(ledger.distributable_cents.tolist()) == [0, 0, 3, 119136]
@@ -0,0 +1,312 @@
+"""Watch-folder mode: keeps running tip totals up to date while POS exports appear or grow.
+
+Every Orders and Time Entries CSV in the folder is followed by byte offset, so each poll parses only
+the rows appended since the last one. Tips per (date, pool) and hours per (date, pool, employee)
+are updated from those rows, and cuts are recomputed only for the pools they touched. State is
+checkpointed after every change, so a restart picks up where it stopped instead of re-reading the
+week.
+
+Exports are assumed to only ever be appended to. A file that shrinks, changes its header or changes
+just before the last position read is taken back out of the totals and read again from the start;
+edits further back are not noticed.
+
+    python watch.py exports/ --out live/ --interval 30
+    python watch.py exports/ --out live/ --once          # catch up once and exit
+"""
+import argparse
+import fnmatch
+import io
+import json
+import os
+import shutil
+import sys
+import time
+
+import pandas as pd
+
+from batch import ORDERS_PATTERNS, TIME_ENTRIES_PATTERNS
+from mainWeekly import (
+    DEFAULT_CHUNKSIZE,
+    DEFAULT_FEE_RATE,
+    ORDERS_DTYPES,
+    PARSER_VERSION,
+    POINT_SYSTEMS,
+    POOL_WINDOWS,
+    TIME_ENTRIES_DTYPES,
+    HoursMatrix,
+    aggregate_orders_chunk,
+    aggregate_time_entries_chunk,
+    named_pool_windows,
+    pool_windows_for,
+)
+from parse_cache import TABLE_EXTENSION, read_table, write_table
+
+STATE_DIR_NAME = '.mygrat-watch'
+
+# Bytes just before a file's offset that must be unchanged for the file to count as appended to
+TAIL_CHECK_BYTES = 256
+
+CUTS_COLUMNS = ['Date', 'Pool', 'Employee', 'Job Title', 'Hours', 'Points', 'Tip Pool', 'Value Per Point', 'Cut']
+
+
+def _empty_totals(levels):
+    arrays = [pd.DatetimeIndex([]) if level == 'Date' else [] for level in levels]
+    return pd.Series(dtype=float, index=pd.MultiIndex.from_arrays(arrays, names=levels))
+
+
+def _empty_cuts():
+    return pd.DataFrame(columns=CUTS_COLUMNS).astype({'Date': 'datetime64[ns]'})
+
+
+def _add_totals(totals, path, delta):
+    """Adds one file's new (Date, Pool[, Employee]) totals into the running per-file totals."""
+    delta = pd.concat({path: delta}, names=['File'])
+    if not len(totals):
+        return delta
+    return pd.concat([totals, delta]).groupby(level=list(totals.index.names)).sum()
+
+
+class FolderWatcher(object):
+    """Incremental tip totals for one watched folder; see the module docstring."""
+
+    def __init__(self, folder, point_system_name='Mocha Red', pool_windows=None, fee_rate=DEFAULT_FEE_RATE,
+                 exact_cents=False, state_dir=None):
+        self.folder = folder
+        self.point_system_name = point_system_name
+        self.point_system = POINT_SYSTEMS[point_system_name]
+        self.pool_windows = pool_windows_for(point_system_name) if pool_windows is None else pool_windows
+        self.fee_rate = fee_rate
+        self.exact_cents = exact_cents
+        self.state_dir = state_dir or os.path.join(folder, STATE_DIR_NAME)
+
+        # path -> {'kind', 'offset', 'header', 'tail'}; totals keep the file they came from so a
+        # rewritten file can be taken back out
+        self.files = {}
+        self.tips = _empty_totals(['File', 'Date', 'Pool'])
+        self.hours = _empty_totals(['File', 'Date', 'Pool', 'Employee', 'Job Title'])
+        self.cuts = _empty_cuts()
+
+    def scan(self):
+        """(path, kind) of every export in the folder, kind being 'orders' or 'time_entries'."""
+        exports = []
+        for name in sorted(os.listdir(self.folder)):
+            path = os.path.join(self.folder, name)
+            if not os.path.isfile(path):
+                continue
+            if any(fnmatch.fnmatch(name, pattern) for pattern in ORDERS_PATTERNS):
+                exports.append((path, 'orders'))
+            elif any(fnmatch.fnmatch(name, pattern) for pattern in TIME_ENTRIES_PATTERNS):
+                exports.append((path, 'time_entries'))
+        return exports
+
+    def poll(self):
+        """Ingests whatever was appended since the last poll; returns the (date, pool) groups touched."""
+        affected = set()
+        for path, kind in self.scan():
+            try:
+                affected |= self._ingest(path, kind)
+            except (OSError, ValueError) as e:
+                # Leave the offset where it was; the file is retried on the next poll
+                print(f"Skipping {os.path.basename(path)}: {str(e).splitlines()[0]}", flush=True)
+        return affected
+
+    def _ingest(self, path, kind):
+        with open(path, 'rb') as f:
+            header = f.readline()
+            state = self.files.get(path)
+            affected = set()
+            if state is not None and not self._is_appended(f, header, state):
+                affected = self._forget(path)
+                state = None
+            offset = len(header) if state is None else state['offset']
+
+            if not header.endswith(b'\n'):
+                return affected  # the header itself is still being written
+            f.seek(offset)
+            data = f.read()
+
+        # Only complete lines; a row still being written is picked up on the next poll
+        data = data[:data.rfind(b'\n') + 1]
+        if data and kind == 'orders':
+            affected |= self._add_orders(path, header + data)
+        elif data:
+            affected |= self._add_time_entries(path, header + data)
+        previous_tail = header if state is None else state['tail'].encode('latin-1')
+        self.files[path] = {'kind': kind, 'offset': offset + len(data), 'header': header.decode('latin-1'),
+                            'tail': (previous_tail + data)[-TAIL_CHECK_BYTES:].decode('latin-1')}
+        return affected
+
+    def _is_appended(self, f, header, state):
+        tail = state['tail'].encode('latin-1')
+        if header.decode('latin-1') != state['header'] or os.fstat(f.fileno()).st_size < state['offset']:
+            return False
+        f.seek(state['offset'] - len(tail))
+        return f.read(len(tail)) == tail
+
+    def _forget(self, path):
+        """Takes a file's contributions back out of the totals; returns the groups they were in."""
+        affected = set()
+        if path in self.tips.index.get_level_values('File'):
+            removed = self.tips.xs(path, level='File')
+            affected |= set(removed.index)
+            self.tips = self.tips.drop(path, level='File')
+        if path in self.hours.index.get_level_values('File'):
+            removed = self.hours.xs(path, level='File')
+            affected |= set(removed.index.droplevel(['Employee', 'Job Title']))
+            self.hours = self.hours.drop(path, level='File')
+        self.files.pop(path, None)
+        return affected
+
+    def _add_orders(self, path, csv_bytes):
+        deltas = [aggregate_orders_chunk(chunk, self.pool_windows) for chunk in
+                  pd.read_csv(io.BytesIO(csv_bytes), usecols=list(ORDERS_DTYPES), dtype=ORDERS_DTYPES,
+                              chunksize=DEFAULT_CHUNKSIZE)]
+        if not deltas:
+            return set()
+        delta = pd.concat(deltas).groupby(level=['Date', 'Pool']).sum()
+        self.tips = _add_totals(self.tips, path, delta)
+        return set(delta.index)
+
+    def _add_time_entries(self, path, csv_bytes):
+        deltas = []
+        for chunk in pd.read_csv(io.BytesIO(csv_bytes), usecols=list(TIME_ENTRIES_DTYPES),
+                                 dtype=TIME_ENTRIES_DTYPES, chunksize=DEFAULT_CHUNKSIZE):
+            deltas.append(aggregate_time_entries_chunk(chunk, self.pool_windows))
+        if not deltas:
+            return set()
+        delta = pd.concat(deltas).groupby(level=['Date', 'Pool', 'Employee', 'Job Title']).sum()
+        self.hours = _add_totals(self.hours, path, delta)
+        return set(delta.index.droplevel(['Employee', 'Job Title']))
+
+    def recompute(self, affected):
+        """Re-allocates only the affected (date, pool) groups and swaps their rows in self.cuts."""
+        if not affected:
+            return
+        tips = self.tips.groupby(level=['Date', 'Pool']).sum()
+        tips = tips[tips.index.isin(affected)]
+        hours = self.hours[self.hours.index.droplevel(['File', 'Employee', 'Job Title']).isin(affected)]
+        hours_table = (hours.groupby(level=['Date', 'Pool', 'Employee', 'Job Title']).sum()
+                       .rename('Hours').reset_index())
+        hours_table['Date'] = hours_table['Date'].dt.date
+
+        tip_pools = {(day.date(), pool): tip for (day, pool), tip in tips.items()}
+        hours_matrix = HoursMatrix(tip_pools, hours_table)
+        new_cuts = hours_matrix.allocate(self.point_system, self.fee_rate, self.exact_cents).cuts_table()
+        new_cuts['Date'] = pd.to_datetime(new_cuts['Date'])
+
+        kept = self.cuts[~pd.MultiIndex.from_frame(self.cuts[['Date', 'Pool']]).isin(affected)]
+        parts = [part for part in (kept, new_cuts) if len(part)] or [new_cuts]
+        self.cuts = pd.concat(parts, ignore_index=True).sort_values(['Date', 'Pool', 'Employee', 'Job Title'],
+                                                                    ignore_index=True)
+
+    def weekly_totals(self):
+        totals = self.cuts.groupby('Employee', sort=True)['Cut'].sum().round(2)
+        return totals.rename('Weekly Tips').reset_index()
+
+    def save_checkpoint(self):
+        """Writes the state next to (then over) the previous checkpoint, so a crash never leaves half of one."""
+        temp_dir = self.state_dir + '.tmp'
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        os.makedirs(temp_dir)
+        with open(os.path.join(temp_dir, 'state.json'), 'w') as f:
+            json.dump({'parser_version': PARSER_VERSION, 'pool_windows': self.pool_windows.key,
+                       'allocation': self.allocation_settings(), 'files': self.files}, f)
+        tables = {'tips': self.tips.rename('Tip').reset_index(),
+                  'hours': self.hours.rename('Hours').reset_index(),
+                  'cuts': self.cuts}
+        for name, df in tables.items():
+            write_table(df, os.path.join(temp_dir, name + TABLE_EXTENSION))
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+        os.replace(temp_dir, self.state_dir)
+
+    def allocation_settings(self):
+        """Everything the cuts depend on beyond the hours and tips, as stored in the checkpoint.
+
+        The point system's contents are kept as well as its name, since "Custom" can change between runs.
+        """
+        return {'point_system_name': self.point_system_name,
+                'point_system': {role: float(points) for role, points in self.point_system.items()},
+                'fee_rate': self.fee_rate, 'exact_cents': bool(self.exact_cents)}
+
+    def load_checkpoint(self):
+        """Restores the last checkpoint; returns False (and starts over) if there is none or it is stale.
+
+        A checkpoint allocated under other settings (point system, fee rate, exact cents) keeps its
+        tips and hours, and every pool is re-allocated under the current settings.
+        """
+        try:
+            with open(os.path.join(self.state_dir, 'state.json')) as f:
+                state = json.load(f)
+            if state['parser_version'] != PARSER_VERSION or state['pool_windows'] != self.pool_windows.key:
+                return False
+            tables = {name: read_table(os.path.join(self.state_dir, name + TABLE_EXTENSION))
+                      for name in ('tips', 'hours', 'cuts')}
+        except (OSError, ValueError, KeyError):
+            return False
+        self.files = state['files']
+        self.tips = tables['tips'].set_index(['File', 'Date', 'Pool'])['Tip']
+        self.hours = tables['hours'].set_index(['File', 'Date', 'Pool', 'Employee', 'Job Title'])['Hours']
+        self.cuts = tables['cuts']
+        if state.get('allocation') != self.allocation_settings():
+            self.cuts = _empty_cuts()
+            self.recompute(set(self.tips.index.droplevel('File'))
+                           | set(self.hours.index.droplevel(['File', 'Employee', 'Job Title'])))
+            self.save_checkpoint()
+        return True
+
+    def write_results(self, out_dir):
+        os.makedirs(out_dir, exist_ok=True)
+        shift_cuts = self.cuts.assign(Date=self.cuts['Date'].dt.date)
+        for name, df in (('WeeklyTotals.csv', self.weekly_totals()), ('ShiftCuts.csv', shift_cuts)):
+            path = os.path.join(out_dir, name)
+            df.to_csv(path + '.tmp', index=False)
+            os.replace(path + '.tmp', path)
+
+    def update(self, out_dir):
+        """One poll: ingest, recompute, checkpoint and write results. Returns the groups recomputed."""
+        affected = self.poll()
+        if affected:
+            self.recompute(affected)
+            self.save_checkpoint()
+            self.write_results(out_dir)
+        return affected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep running tip totals for a folder of growing POS exports.")
+    parser.add_argument('folder')
+    parser.add_argument('--out', default='live', help="Directory for WeeklyTotals.csv and ShiftCuts.csv")
+    parser.add_argument('--interval', type=float, default=30, help="Seconds between polls")
+    parser.add_argument('--once', action='store_true', help="Catch up once and exit instead of watching")
+    parser.add_argument('--point-system', default='Mocha Red', choices=list(POINT_SYSTEMS))
+    parser.add_argument('--pool-windows', choices=list(POOL_WINDOWS),
+                        help="Tip pools (default: the point system's)")
+    parser.add_argument('--fee-rate', type=float, default=DEFAULT_FEE_RATE)
+    parser.add_argument('--exact-cents', action='store_true')
+    parser.add_argument('--state', help=f"Checkpoint directory (default: <folder>/{STATE_DIR_NAME})")
+    args = parser.parse_args(argv)
+
+    pool_windows = named_pool_windows(args.pool_windows) if args.pool_windows else None
+    watcher = FolderWatcher(args.folder, args.point_system, pool_windows, args.fee_rate, args.exact_cents,
+                            args.state)
+    if watcher.load_checkpoint():
+        print(f"Resumed from {watcher.state_dir} ({len(watcher.files)} files).", flush=True)
+        watcher.write_results(args.out)  # the checkpoint may have been re-allocated under new settings
+
+    try:
+        while True:
+            started = time.perf_counter()
+            affected = watcher.update(args.out)
+            if affected:
+                print(f"{time.strftime('%H:%M:%S')} recomputed {len(affected)} pools in "
+                      f"{time.perf_counter() - started:.2f}s; {watcher.cuts['Cut'].sum():,.2f} distributed so far.",
+                      flush=True)
+            if args.once:
+                return 0
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import traceback
+from contextlib import nullcontext
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+from mainWeekly import PipelineCancelled
+
+
+class PipelineWorker(QObject):
+    """Runs one pipeline task off the GUI thread and reports back through signals.
+
+    The task is called as task(*args, progress=..., should_cancel=..., **kwargs), where
+    progress(percent, message) forwards to the `progress` signal and should_cancel() turns True
+    once cancel() is called. Setting `recorder` to an instrumentation.StageRecorder records the
+    task's stage timings on the worker thread. Tasks that take a warn callback can be given
+    warn=worker.warning.emit to send their warnings back to the GUI thread.
+    """
+    progress = pyqtSignal(int, str)
+    warning = pyqtSignal(list)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, task, *args, **kwargs):
+        super(PipelineWorker, self).__init__()
+        self.task = task
+        self.args = args
+        self.kwargs = kwargs
+        self.recorder = None
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def is_cancelled(self):
+        return self._cancel_requested
+
+    def run(self):
+        try:
+            with self.recorder if self.recorder is not None else nullcontext():
+                result = self.task(*self.args, progress=self.progress.emit, should_cancel=self.is_cancelled,
+                                   **self.kwargs)
+        except PipelineCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(f"An error occurred: {str(e)}\n\n{traceback.format_exc()}")
+        else:
+            self.finished.emit(result)
+
+
+def start_worker(parent, worker):
+    """Moves the worker onto its own QThread, starts it and returns the thread.
+
+    The thread quits and both objects are cleaned up once the worker finishes, fails or is cancelled.
+    """
+    thread = QThread(parent)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    for signal in (worker.finished, worker.failed, worker.cancelled):
+        signal.connect(thread.quit)
+    thread.finished.connect(worker.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    thread.start()
+    return thread